@@ -0,0 +1,3 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import json
+
+import click
+from hatch.utils.fs import temp_directory
+
+from benchmarks.suite import FLOWS, Benchmark
+
+
+def parse_pairs(pairs, convert):
+    parsed = {}
+    for pair in pairs:
+        key, separator, value = pair.partition('=')
+        if not separator:
+            raise click.BadParameter(f'expected KEY=VALUE: {pair}')
+
+        parsed[key] = convert(value)
+
+    return parsed
+
+
+def parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+@click.command()
+@click.argument('flows', nargs=-1, type=click.Choice(FLOWS))
+@click.option('--iterations', '-n', default=10, show_default=True, help='The number of measured runs of each flow')
+@click.option(
+    '--latency',
+    '-l',
+    multiple=True,
+    help='Seconds that a docker command takes e.g. `start=0.3` or `image inspect=0.01`, `default` applies to all',
+)
+@click.option('--option', '-o', multiple=True, help='An environment option e.g. `exec-agent=true`')
+@click.option('--json', 'as_json', is_flag=True, help='Output the results as JSON')
+def main(flows, iterations, latency, option, as_json):
+    """
+    Measure the docker invocations and wall time of the plugin's operations against a stub `docker`.
+    """
+    latency = parse_pairs(latency, float)
+    options = parse_pairs(option, parse_value)
+
+    results = []
+    with temp_directory() as temp_dir:
+        benchmark = Benchmark(temp_dir, latency=latency, options=options)
+        for flow in flows or FLOWS:
+            results.append(benchmark.run(flow, iterations).as_dict())
+
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        flow, calls, mean, minimum = result['flow'], result['calls'], result['mean'] * 1000, result['min'] * 1000
+        commands = ', '.join(f'{command} {count:g}' for command, count in result['commands'].items())
+        click.echo(f'{flow:<22}{calls:>6g} calls{mean:>10.1f} ms mean{minimum:>10.1f} ms min    {commands}')
+
+
+if __name__ == '__main__':
+    main()
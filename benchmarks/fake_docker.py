@@ -0,0 +1,197 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+"""
+A stand-in for the `docker` executable that records every invocation and keeps just enough state about
+containers and images for the plugin to work, without a daemon.
+
+It is configured with the following environment variables:
+
+- `FAKE_DOCKER_STATE`: the JSON file that holds the state
+- `FAKE_DOCKER_LOG`: the file to which a JSON line is appended for every invocation
+- `FAKE_DOCKER_LATENCY`: a JSON object mapping commands like `start` or `image inspect` to the number of
+  seconds to sleep before responding, with `default` applying to all others
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# These are followed by the actual command
+MANAGEMENT_COMMANDS = ('buildx', 'container', 'image', 'volume')
+
+# Options of the commands that the plugin uses which take a value
+VALUE_OPTIONS = frozenset(
+    (
+        '--env',
+        '--env-file',
+        '--file',
+        '--filter',
+        '--format',
+        '--label',
+        '--name',
+        '--tag',
+        '--time',
+        '--volume',
+        '--workdir',
+    )
+)
+
+
+def get_command(args: list[str]) -> str:
+    if len(args) > 1 and args[0] in MANAGEMENT_COMMANDS:
+        return f'{args[0]} {args[1]}'
+
+    return args[0] if args else ''
+
+
+def parse_args(args: list[str]) -> tuple[dict[str, list[str]], list[str]]:
+    """
+    Split the arguments of a command into options and positional arguments, which end at the first
+    positional argument of commands that run something in a container.
+    """
+    options: dict[str, list[str]] = {}
+    positional: list[str] = []
+    it = iter(args)
+    for arg in it:
+        if positional:
+            positional.append(arg)
+        elif arg in VALUE_OPTIONS:
+            options.setdefault(arg, []).append(next(it, ''))
+        elif arg.startswith('-') and arg != '-':
+            options.setdefault(arg, []).append('')
+        else:
+            positional.append(arg)
+
+    return options, positional
+
+
+@contextmanager
+def locked_state(path: str):
+    with open(f'{path}.lock', 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+        state.setdefault('containers', {})
+        state.setdefault('images', {})
+        state.setdefault('counter', 0)
+        yield state
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+
+def new_id(state: dict) -> str:
+    state['counter'] += 1
+    counter = state['counter']
+    return f'sha256:{counter:064x}'
+
+
+def handle(command: str, args: list[str], state: dict) -> tuple[int, str]:
+    options, positional = parse_args(args)
+    containers = state['containers']
+    images = state['images']
+
+    if command in ('build', 'pull', 'commit'):
+        if '-' in positional:
+            # Consume the streamed context
+            sys.stdin.buffer.read()
+
+        image = options['--tag'][0] if command == 'build' else positional[-1]
+        images[image] = new_id(state)
+    elif command == 'create':
+        name = options['--name'][0]
+        if name in containers:
+            return 1, f'Conflict. The container name "/{name}" is already in use'
+
+        labels = dict(label.partition('=')[::2] for label in options.get('--label', []))
+        containers[name] = {'status': 'created', 'image': positional[0], 'labels': labels}
+    elif command in ('start', 'stop', 'pause', 'unpause', 'exec', 'rm', 'container inspect'):
+        names = positional[:1] if command == 'exec' else positional
+        for name in names:
+            if name not in containers:
+                if command == 'rm' and '--force' in options:
+                    continue
+
+                return 1, f'No such container: {name}'
+
+            if command == 'start' or command == 'unpause':
+                containers[name]['status'] = 'running'
+            elif command == 'stop':
+                containers[name]['status'] = 'exited'
+            elif command == 'pause':
+                containers[name]['status'] = 'paused'
+            elif command == 'rm':
+                del containers[name]
+            elif command == 'container inspect':
+                return 0, containers[name]['status']
+    elif command == 'cp':
+        if positional[0] == '-':
+            sys.stdin.buffer.read()
+    elif command == 'ps':
+        names = sorted(containers)
+        for container_filter in options.get('--filter', []):
+            key, _, value = container_filter.partition('=')
+            if key == 'name':
+                names = [name for name in names if value in name]
+            elif key == 'label':
+                label, _, label_value = value.partition('=')
+                names = [
+                    name
+                    for name in names
+                    if label in containers[name]['labels']
+                    and (not label_value or containers[name]['labels'][label] == label_value)
+                ]
+
+        if '{{.State}}' in options.get('--format', [''])[0]:
+            lines = []
+            for name in names:
+                status = containers[name]['status']
+                lines.append(f'{name}\t{status}')
+
+            return 0, '\n'.join(lines)
+
+        return 0, '\n'.join(names)
+    elif command == 'image inspect':
+        if positional[0] not in images:
+            return 1, f'No such image: {positional[0]}'
+
+        return 0, images[positional[0]]
+    elif command == 'image rm':
+        images.pop(positional[0], None)
+
+    return 0, ''
+
+
+def main(args: list[str]) -> int:
+    command = get_command(args)
+    args = args[len(command.split()) :]
+
+    start = time.perf_counter()
+    latency = json.loads(os.environ.get('FAKE_DOCKER_LATENCY') or '{}')
+    time.sleep(latency.get(command, latency.get('default', 0)))
+
+    with locked_state(os.environ['FAKE_DOCKER_STATE']) as state:
+        exit_code, output = handle(command, args, state)
+
+    with open(os.environ['FAKE_DOCKER_LOG'], 'a', encoding='utf-8') as f:
+        record = {'command': command, 'duration': time.perf_counter() - start}
+        f.write(f'{json.dumps(record)}\n')
+
+    if output:
+        stream = sys.stderr if exit_code else sys.stdout
+        stream.write(f'{output}\n')
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,206 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import click
+from hatch.project.core import Project
+from hatch.utils.fs import Path
+from hatch.utils.platform import Platform
+from hatch.utils.structures import EnvVars
+
+from hatch_containers import plugin
+from hatch_containers.plugin import ContainerEnvironment
+
+FLOWS = ('create', 'remove', 'run', 'build', 'dependencies_in_sync')
+
+PROJECT_FILE = """\
+[project]
+name = "bench"
+version = "0.0.1"
+"""
+
+
+class FakeDocker:
+    """
+    Installs the stub `docker` executable of `fake_docker.py` in `directory` and reads back its record of
+    invocations.
+    """
+
+    def __init__(self, directory: Path, latency: dict[str, float]):
+        self.directory = directory
+        self.latency = latency
+
+        self.bin_directory = directory / 'bin'
+        self.state_file = directory / 'state.json'
+        self.log_file = directory / 'log.jsonl'
+
+    def install(self):
+        self.bin_directory.ensure_dir_exists()
+        executable = self.bin_directory / 'docker'
+        executable.write_text(
+            f'#!{sys.executable}\n'
+            'import sys\n'
+            f'sys.path.insert(0, {str(Path(__file__).parent)!r})\n'
+            'from fake_docker import main\n'
+            'sys.exit(main(sys.argv[1:]))\n'
+        )
+        executable.chmod(0o755)
+
+    @contextmanager
+    def activated(self):
+        self.install()
+        path = os.environ.get('PATH', '')
+        env_vars = {
+            'PATH': f'{self.bin_directory}{os.pathsep}{path}',
+            'FAKE_DOCKER_STATE': str(self.state_file),
+            'FAKE_DOCKER_LOG': str(self.log_file),
+            'FAKE_DOCKER_LATENCY': json.dumps(self.latency),
+        }
+        with EnvVars(env_vars):
+            yield
+
+    def consume_log(self) -> list[str]:
+        """
+        Return the commands that were invoked since the last call.
+        """
+        if not self.log_file.is_file():
+            return []
+
+        commands = [json.loads(line)['command'] for line in self.log_file.read_text().splitlines()]
+        self.log_file.remove()
+        return commands
+
+
+class Result:
+    def __init__(self, flow: str, iterations: int):
+        self.flow = flow
+        self.iterations = iterations
+        self.times: list[float] = []
+        self.commands: Counter[str] = Counter()
+
+    @property
+    def calls(self) -> float:
+        return sum(self.commands.values()) / self.iterations
+
+    def as_dict(self) -> dict:
+        return {
+            'flow': self.flow,
+            'iterations': self.iterations,
+            'calls': self.calls,
+            'commands': {command: count / self.iterations for command, count in sorted(self.commands.items())},
+            'mean': statistics.mean(self.times),
+            'min': min(self.times),
+        }
+
+
+class Benchmark:
+    """
+    Measures the number of `docker` invocations and the wall time of the plugin's operations on a project
+    in `directory`. Every measured operation uses a new environment instance with no state left in memory,
+    like a separate Hatch process.
+    """
+
+    def __init__(self, directory: Path, *, latency: dict[str, float] | None = None, options: dict | None = None):
+        self.directory = directory
+        self.docker = FakeDocker(directory / 'docker', latency or {})
+        self.options = options or {}
+
+        self.root = directory / 'project'
+        self.data_directory = directory / 'data'
+        self.platform = Platform()
+
+    def environment(self) -> ContainerEnvironment:
+        for state in (plugin.ACTIVATIONS, plugin.STARTED_CONTAINERS, plugin.BUILT_IMAGES, plugin.RESOLVED_IMAGES):
+            state.clear()
+
+        plugin.CONTAINER_STATES.clear()
+        plugin.CONTAINER_STATES_QUERIED.clear()
+
+        self.root.ensure_dir_exists()
+        (self.root / 'pyproject.toml').write_text(PROJECT_FILE)
+        project = Project(self.root)
+        config = {'type': 'container', 'image': 'python:3.11', 'dependencies': ['requests'], **self.options}
+        # The stub can only stand in for the `docker` executable
+        config['backend'] = 'cli'
+
+        return ContainerEnvironment(
+            self.root, project.metadata, 'default', config, {}, self.data_directory, self.platform, 0
+        )
+
+    def prepare(self, flow: str):
+        # Deferred removals must not be flushed by the measured operation
+        with click.Context(click.Command('prepare')):
+            self.prepare_flow(flow)
+
+    def prepare_flow(self, flow: str):
+        environment = self.environment()
+        exists = environment.exists()
+        if flow == 'create':
+            if exists:
+                environment.remove()
+        elif not exists:
+            environment.create()
+
+        if flow == 'dependencies_in_sync':
+            state = environment.load_state()
+            state.pop('dependencies', None)
+            environment.state_file.remove()
+            environment.save_state(**state)
+
+    def execute(self, flow: str):
+        # Containers are released when the Hatch command finishes
+        with click.Context(click.Command(flow)):
+            self.execute_flow(flow)
+
+    def execute_flow(self, flow: str):
+        environment = self.environment()
+        if flow == 'create':
+            # What `hatch env create` does for a missing environment
+            environment.exists()
+            environment.create()
+        elif flow == 'remove':
+            environment.remove()
+        elif flow == 'run':
+            # What `hatch run` does for an existing environment
+            environment.exists()
+            environment.dependencies_in_sync()
+            with environment.command_context():
+                environment.run_shell_command('true')
+        elif flow == 'build':
+            with environment.build_environment(['hatchling']) as build_environment:
+                process = environment.get_build_process(
+                    build_environment, directory=str(self.directory / 'dist'), targets=['wheel']
+                )
+                process.communicate()
+        elif flow == 'dependencies_in_sync':
+            environment.dependencies_in_sync()
+        else:
+            raise ValueError(f'Unknown flow: {flow}')
+
+    def run(self, flow: str, iterations: int) -> Result:
+        result = Result(flow, iterations)
+        with self.docker.activated():
+            # Images only have to be built once so the first iteration is not representative
+            self.prepare(flow)
+            self.execute(flow)
+
+            for _ in range(iterations):
+                self.prepare(flow)
+                self.docker.consume_log()
+
+                start = time.perf_counter()
+                self.execute(flow)
+                result.times.append(time.perf_counter() - start)
+
+                result.commands.update(self.docker.consume_log())
+
+        return result
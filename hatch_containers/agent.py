@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+"""
+A long-lived process that runs inside containers and executes commands on behalf of the plugin.
+
+This file is copied into containers as-is and therefore must only rely on the standard library.
+
+Every connection to the agent's Unix socket runs a single command. The client sends one line of JSON
+containing `args`, `env` and `cwd` and then receives frames, each with an 8-byte header: the frame type,
+3 bytes of padding, and the big-endian payload size. Frames of type 1 and 2 are chunks of standard output
+and standard error respectively, and the final frame of type 3 contains the signed 4-byte exit code.
+"""
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+STDOUT = 1
+STDERR = 2
+EXIT = 3
+HEADER_SIZE = 8
+
+
+class AgentUnavailableError(ConnectionError):
+    pass
+
+
+def pack_frame(frame_type, payload):
+    return bytes((frame_type, 0, 0, 0)) + len(payload).to_bytes(4, 'big') + payload
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+
+        env = dict(os.environ)
+        env.update(request.get('env') or {})
+        try:
+            process = subprocess.Popen(
+                request['args'],
+                cwd=request.get('cwd') or None,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as e:
+            self.send(STDERR, f'{e}\n'.encode())
+            self.send(EXIT, (127).to_bytes(4, 'big', signed=True))
+            return
+
+        lock = threading.Lock()
+        relays = [
+            threading.Thread(target=self.relay, args=(process.stdout, STDOUT, lock)),
+            threading.Thread(target=self.relay, args=(process.stderr, STDERR, lock)),
+        ]
+        for relay in relays:
+            relay.start()
+
+        # Kill the command if the client goes away, e.g. after a keyboard interrupt
+        threading.Thread(target=self.watch, args=(process,), daemon=True).start()
+
+        for relay in relays:
+            relay.join()
+
+        exit_code = process.wait()
+        if exit_code < 0:
+            exit_code = 128 - exit_code
+
+        with lock:
+            self.send(EXIT, exit_code.to_bytes(4, 'big', signed=True))
+
+    def relay(self, pipe, frame_type, lock):
+        for chunk in iter(lambda: pipe.read1(65536), b''):
+            with lock:
+                try:
+                    self.send(frame_type, chunk)
+                except OSError:
+                    return
+
+    def watch(self, process):
+        try:
+            data = self.request.recv(1)
+        except OSError:
+            data = b''
+
+        if not data and process.poll() is None:
+            process.kill()
+
+    def send(self, frame_type, payload):
+        self.request.sendall(pack_frame(frame_type, payload))
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(socket_path):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    server = AgentServer(socket_path, CommandHandler)
+
+    # The socket is created by the container's user but used by the host's user
+    os.chmod(socket_path, 0o666)  # noqa: S103
+
+    return server
+
+
+def serve(socket_path):
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with create_server(socket_path) as server:
+        server.serve_forever()
+
+
+def run(socket_path, args, *, env=None, cwd=None, stdout=None, stderr=None, timeout=2):
+    """
+    Run a command through the agent listening on `socket_path`, passing each chunk of output to the
+    `stdout` and `stderr` callbacks as it arrives, and return the command's exit code.
+
+    An `AgentUnavailableError` is raised if the agent does not accept the connection within `timeout` seconds
+    or closes it before responding, and a `ConnectionError` if the connection is lost after that.
+    """
+    client = connect(socket_path, timeout)
+    received = False
+    with client:
+        try:
+            request = {'args': args, 'env': env or {}, 'cwd': cwd}
+            client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+            reader = client.makefile('rb')
+            while True:
+                header = reader.read(HEADER_SIZE)
+                if len(header) < HEADER_SIZE:
+                    raise ConnectionError('The agent closed the connection before the command finished')
+
+                received = True
+                payload = reader.read(int.from_bytes(header[4:], 'big'))
+                if header[0] == EXIT:
+                    return int.from_bytes(payload, 'big', signed=True)
+
+                callback = stderr if header[0] == STDERR else stdout
+                if callback is not None:
+                    callback(payload)
+        # Nothing was lost if the agent went away before responding, so the command may be run another way
+        except ConnectionError as e:
+            if received:
+                raise
+
+            raise AgentUnavailableError(f'The agent did not respond: {e}') from None
+
+
+def connect(socket_path, timeout):
+    # Wait for the agent to bind when the container has only just started
+    deadline = time.monotonic() + timeout
+    while True:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            client.close()
+            if time.monotonic() >= deadline:
+                raise AgentUnavailableError(f'Unable to connect to the agent: {e}') from None
+
+            time.sleep(0.005)
+        except OSError as e:
+            client.close()
+            raise AgentUnavailableError(f'Unable to connect to the agent: {e}') from None
+        else:
+            return client
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1])
@@ -0,0 +1,613 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import atexit
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, cast
+
+from hatch_containers.engine import EngineClient, EngineError
+from hatch_containers.utils import pid_exists
+
+# Pass environment variables to the `docker` executable in a file when there are more than this many
+ENV_FILE_THRESHOLD = 16
+
+# Environment variable files written by this process that have not been removed yet
+ENV_FILES: set[str] = set()
+
+# Every container created by the plugin has this label, whose value is the kind of container
+CONTAINER_LABEL = 'hatch-containers'
+
+# The maximum number of requests that are sent to the Engine API at the same time
+MAX_CONCURRENT_REQUESTS = 8
+
+
+class CLIBackend:
+    """
+    Manages containers by invoking the `docker` executable.
+    """
+
+    def __init__(self, platform, verbosity: int, app):
+        self.platform = platform
+        self.verbosity = verbosity
+        self.app = app
+
+        self.__buildkit_available: bool | None = None
+
+    def buildkit_available(self) -> bool:
+        if self.__buildkit_available is None:
+            process = self.platform.run_command(['docker', 'buildx', 'version'], capture_output=True)
+            self.__buildkit_available = not process.returncode
+
+        return self.__buildkit_available
+
+    def build(self, tag: str, dockerfile, context, *, pull=True, buildkit=False):
+        command = ['docker', 'build']
+        if pull:
+            command.append('--pull')
+
+        command.extend(('--tag', tag, '--file', str(dockerfile), str(context)))
+        env = self.get_build_env(buildkit=buildkit)
+        if self.verbosity > 0:  # no cov
+            self.platform.check_command(command, env=env)
+        else:
+            self.platform.check_command_output(command, env=env)
+
+    def build_archive(self, tag: str, archive, *, pull=True, buildkit=False):
+        """
+        Build an image from a context that is streamed as chunks of a tar archive with a `Dockerfile` at its root.
+        """
+        command = ['docker', 'build']
+        if pull:
+            command.append('--pull')
+
+        command.extend(('--tag', tag, '-'))
+        self.check_streamed_command(command, archive, env=self.get_build_env(buildkit=buildkit))
+
+    @staticmethod
+    def get_build_env(*, buildkit=False) -> dict | None:
+        # Older versions of the `docker` executable only use BuildKit when asked to
+        return {**os.environ, 'DOCKER_BUILDKIT': '1'} if buildkit else None
+
+    def put_archive(self, name: str, path: str, archive):
+        """
+        Extract chunks of a tar archive into the directory `path` of a container.
+        """
+        self.check_streamed_command(['docker', 'cp', '-', f'{name}:{path}'], archive)
+
+    def check_streamed_command(self, command: list[str], chunks, *, env=None):
+        with tempfile.TemporaryFile() as output:
+            process = subprocess.Popen(
+                self.platform.format_for_subprocess(command, shell=False),
+                stdin=subprocess.PIPE,
+                stdout=None if self.verbosity > 0 else output,
+                stderr=None if self.verbosity > 0 else subprocess.STDOUT,
+                env=env,
+            )
+            stdin = cast(IO[bytes], process.stdin)
+            try:
+                for chunk in chunks:
+                    stdin.write(chunk)
+
+                stdin.close()
+            # The command failed before reading everything, which is reported by its exit code
+            except BrokenPipeError:
+                pass
+
+            if process.wait():
+                output.seek(0)
+                write_bytes(output.read())
+                self.platform.exit_with_code(process.returncode)
+
+    def pull(self, image: str) -> subprocess.CompletedProcess:
+        # This is never done through the Engine API since only the `docker` executable knows the credentials
+        return self.platform.run_command(['docker', 'pull', image], capture_output=True)
+
+    def create(
+        self,
+        name: str,
+        image: str,
+        command: list[str],
+        *,
+        workdir: str,
+        volumes=(),
+        env=None,
+        env_directory=None,
+        labels=None,
+    ):
+        # fmt: off
+        args = [
+            'docker', 'create',
+            '--name', name,
+            '--workdir', workdir,
+        ]
+        # fmt: on
+
+        for volume in volumes:
+            args.extend(('--volume', volume))
+
+        for label, value in (labels or {}).items():
+            args.extend(('--label', f'{label}={value}'))
+
+        self.apply_env_vars(args, env, env_directory)
+        args.append(image)
+        args.extend(command)
+
+        try:
+            self.platform.check_command_output(args)
+        finally:
+            remove_env_files(args)
+
+    def start(self, name: str):
+        self.platform.check_command_output(['docker', 'start', name])
+
+    def stop(self, name: str):
+        self.platform.check_command_output(['docker', 'stop', '--time', '0', name])
+
+    def pause(self, name: str):
+        self.platform.check_command_output(['docker', 'pause', name])
+
+    def unpause(self, name: str):
+        self.platform.check_command_output(['docker', 'unpause', name])
+
+    def remove(self, name: str, *, force=False):
+        if force:
+            # Containers that do not exist are not an error
+            self.platform.run_command(['docker', 'rm', '--force', name], capture_output=True)
+        else:
+            self.platform.check_command_output(['docker', 'rm', name])
+
+    def status(self, name: str) -> str:
+        process = self.platform.run_command(
+            ['docker', 'container', 'inspect', '--format', '{{.State.Status}}', name], capture_output=True
+        )
+
+        return '' if process.returncode else process.stdout.decode('utf-8').strip()
+
+    def image_id(self, name: str) -> str:
+        process = self.platform.run_command(
+            ['docker', 'image', 'inspect', '--format', '{{.Id}}', name], capture_output=True
+        )
+
+        return '' if process.returncode else process.stdout.decode('utf-8').strip()
+
+    def remove_image(self, name: str):
+        self.platform.run_command(['docker', 'image', 'rm', name], capture_output=True)
+
+    def inspect_images(self, names: list[str]) -> dict[str, tuple[str, int]]:
+        """
+        Return the ID and size of every image that exists, keyed by name.
+        """
+        if not names:
+            return {}
+
+        # Missing images are reported as errors but the others are still listed
+        process = self.platform.run_command(
+            ['docker', 'image', 'inspect', '--format', '{{.Id}}\t{{.Size}}\t{{join .RepoTags " "}}', *names],
+            capture_output=True,
+        )
+
+        images = {}
+        for line in process.stdout.decode('utf-8').splitlines():
+            image_id, _, rest = line.strip().partition('\t')
+            size, _, tags = rest.partition('\t')
+            for tag in tags.split():
+                if tag in names:
+                    images[tag] = (image_id, int(size))
+
+        return images
+
+    def container_images(self) -> set[str]:
+        """
+        Return the images of all containers, as they were referred to when the containers were created.
+        """
+        output = self.platform.check_command_output(['docker', 'ps', '-a', '--no-trunc', '--format', '{{.Image}}'])
+        return {line.strip() for line in output.splitlines() if line.strip()}
+
+    def remove_images(self, names: list[str]):
+        # Images that are in use are left alone
+        self.platform.run_command(['docker', 'image', 'rm', *names], capture_output=True)
+
+    def prune_images(self, label: str):
+        """
+        Remove all images with `label` that have no name.
+        """
+        self.platform.run_command(
+            ['docker', 'image', 'prune', '--force', '--filter', f'label={label}'], capture_output=True
+        )
+
+    def remove_containers(self, names: list[str]):
+        """
+        Forcibly remove all of the containers in one call, ignoring any that do not exist.
+        """
+        # The `docker` executable removes the containers concurrently
+        self.run_removal(['docker', 'rm', '--force', *names])
+
+    def remove_volumes(self, names: list[str]):
+        """
+        Remove all of the volumes in one call, ignoring any that do not exist.
+        """
+        self.run_removal(['docker', 'volume', 'rm', *names])
+
+    def run_removal(self, command: list[str]):
+        process = self.platform.run_command(command, capture_output=True)
+        if not process.returncode:
+            return
+
+        # Every object that could not be removed has its own line
+        errors = [
+            line
+            for line in process.stderr.decode('utf-8', errors='replace').splitlines()
+            if line.strip() and 'no such' not in line.lower()
+        ]
+        if errors:
+            self.app.abort('\n'.join(errors), code=process.returncode)
+
+    def commit(self, name: str, image: str):
+        self.platform.check_command_output(['docker', 'commit', name, image])
+
+    def exists(self, name: str) -> bool:
+        output = self.platform.check_command_output(
+            ['docker', 'ps', '-a', '--format', '{{.Names}}', '--filter', f'name={name}']
+        )
+
+        return any(line.strip() == name for line in output.splitlines())
+
+    def list_containers(self, label: str) -> dict[str, str]:
+        """
+        Return the status of every container with `label`, keyed by name.
+        """
+        output = self.platform.check_command_output(
+            ['docker', 'ps', '-a', '--format', '{{.Names}}\t{{.State}}', '--filter', f'label={label}']
+        )
+
+        containers = {}
+        for line in output.splitlines():
+            name, _, status = line.strip().partition('\t')
+            if name:
+                containers[name] = status
+
+        return containers
+
+    def exec(self, name: str, args: list[str], *, env=None, env_directory=None, capture_output=False):
+        command = self.construct_exec_command(name, args, env=env, env_directory=env_directory)
+        try:
+            return self.platform.run_command(command, capture_output=capture_output)
+        finally:
+            remove_env_files(command)
+
+    @classmethod
+    def construct_exec_command(
+        cls, name: str, args: list[str], *, env=None, env_directory=None, interactive=False
+    ) -> list[str]:
+        command = ['docker', 'exec']
+        if interactive:  # no cov
+            command.append('-it')
+
+        cls.apply_env_vars(command, env, env_directory)
+        command.append(name)
+        command.extend(args)
+        return command
+
+    @staticmethod
+    def apply_env_vars(command, env, env_directory=None):
+        """
+        Add options for the environment variables to `command`. If there are many and `env_directory` is set,
+        they are written to a file in that directory instead to keep the command short.
+        """
+        env = env or {}
+        if env_directory is not None and len(env) > ENV_FILE_THRESHOLD:
+            # Values that span multiple lines cannot be represented in files
+            env_file_vars = {env_var: value for env_var, value in env.items() if '\n' not in value}
+            command.extend(('--env-file', write_env_file(env_directory, env_file_vars)))
+            env = {env_var: value for env_var, value in env.items() if env_var not in env_file_vars}
+
+        for env_var, value in env.items():
+            command.extend(('--env', f'{env_var}={value}'))
+
+
+class EngineBackend(CLIBackend):
+    """
+    Manages containers by talking to the Engine API over a persistent Unix socket connection.
+    Anything the API cannot handle as cheaply is delegated to the `docker` executable.
+    """
+
+    def __init__(self, client: EngineClient, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = client
+
+    @contextmanager
+    def handle_errors(self):
+        try:
+            yield
+        except EngineError as e:
+            self.app.abort(e.message)
+
+    def build(self, tag: str, dockerfile, context, *, pull=True, buildkit=False):
+        # Only self-contained build directories are sent directly, since otherwise the `.dockerignore`
+        # semantics of the `docker` executable would have to be replicated. BuildKit requires a session
+        # that only the `docker` executable implements.
+        if buildkit or dockerfile.parent != context or (context / '.dockerignore').exists():
+            super().build(tag, dockerfile, context, pull=pull, buildkit=buildkit)
+            return
+
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as archive:
+            with tarfile.open(fileobj=archive, mode='w') as tar:
+                tar.add(str(context), arcname='.')
+
+            archive.seek(0)
+            output = write_text if self.verbosity > 0 else None
+            with self.handle_errors():
+                self.client.build(tag, archive, dockerfile=dockerfile.name, pull=pull, output=output)
+
+    def build_archive(self, tag: str, archive, *, pull=True, buildkit=False):
+        if buildkit:
+            super().build_archive(tag, archive, pull=pull, buildkit=buildkit)
+            return
+
+        output = write_text if self.verbosity > 0 else None
+        with self.handle_errors():
+            self.client.build(tag, archive, pull=pull, output=output)
+
+    def put_archive(self, name: str, path: str, archive):
+        with self.handle_errors():
+            self.client.put_archive(name, path, archive)
+
+    def create(
+        self,
+        name: str,
+        image: str,
+        command: list[str],
+        *,
+        workdir: str,
+        volumes=(),
+        env=None,
+        env_directory=None,
+        labels=None,
+    ):
+        config = {
+            'Image': image,
+            'Cmd': command,
+            'WorkingDir': workdir,
+            'Env': [f'{key}={value}' for key, value in (env or {}).items()],
+            'Labels': dict(labels or {}),
+            'HostConfig': {'Binds': list(volumes)},
+        }
+        with self.handle_errors():
+            self.client.create_container(name, config)
+
+    def start(self, name: str):
+        with self.handle_errors():
+            self.client.start_container(name)
+
+    def stop(self, name: str):
+        with self.handle_errors():
+            self.client.stop_container(name, timeout=0)
+
+    def pause(self, name: str):
+        with self.handle_errors():
+            self.client.pause_container(name)
+
+    def unpause(self, name: str):
+        with self.handle_errors():
+            self.client.unpause_container(name)
+
+    def remove(self, name: str, *, force=False):
+        if force:
+            try:
+                self.client.remove_container(name, force=True)
+            except EngineError:
+                pass
+
+            return
+
+        with self.handle_errors():
+            self.client.remove_container(name)
+
+    def status(self, name: str) -> str:
+        with self.handle_errors():
+            container = self.client.inspect_container(name)
+
+        return container['State']['Status'] if container else ''
+
+    def image_id(self, name: str) -> str:
+        with self.handle_errors():
+            image = self.client.inspect_image(name)
+
+        return image['Id'] if image else ''
+
+    def remove_image(self, name: str):
+        # Images that are in use or already gone are left alone
+        try:
+            self.client.remove_image(name)
+        except EngineError:
+            pass
+
+    def inspect_images(self, names: list[str]) -> dict[str, tuple[str, int]]:
+        images = {}
+        with self.handle_errors():
+            for name in names:
+                image = self.client.inspect_image(name)
+                if image:
+                    images[name] = (image['Id'], image['Size'])
+
+        return images
+
+    def container_images(self) -> set[str]:
+        with self.handle_errors():
+            containers = self.client.list_containers()
+
+        return {container['Image'] for container in containers} | {container['ImageID'] for container in containers}
+
+    def remove_images(self, names: list[str]):
+        self.map_ignoring_errors(self.client.remove_image, names)
+
+    def prune_images(self, label: str):
+        with self.handle_errors():
+            self.client.prune_images(filters={'label': [label]})
+
+    def remove_containers(self, names: list[str]):
+        self.map_ignoring_missing(lambda name: self.client.remove_container(name, force=True), names)
+
+    def remove_volumes(self, names: list[str]):
+        self.map_ignoring_missing(self.client.remove_volume, names)
+
+    @staticmethod
+    def map_ignoring_errors(function, names: list[str]):
+        def call(name):
+            try:
+                function(name)
+            except EngineError:
+                pass
+
+        # Every request uses its own connection so the daemon handles them concurrently
+        with ThreadPoolExecutor(max_workers=min(len(names), MAX_CONCURRENT_REQUESTS) or 1) as executor:
+            list(executor.map(call, names))
+
+    def map_ignoring_missing(self, function, names: list[str]):
+        def call(name) -> str:
+            try:
+                function(name)
+            except EngineError as e:
+                if e.status != 404:
+                    return e.message
+
+            return ''
+
+        # Every request uses its own connection so the daemon handles them concurrently
+        with ThreadPoolExecutor(max_workers=min(len(names), MAX_CONCURRENT_REQUESTS) or 1) as executor:
+            errors = [error for error in executor.map(call, names) if error]
+
+        if errors:
+            self.app.abort('\n'.join(errors))
+
+    def commit(self, name: str, image: str):
+        repository, tag = image.rsplit(':', 1)
+        with self.handle_errors():
+            self.client.commit_container(name, repository, tag)
+
+    def exists(self, name: str) -> bool:
+        with self.handle_errors():
+            containers = self.client.list_containers(filters={'name': [name]})
+
+        return any(f'/{name}' in container['Names'] for container in containers)
+
+    def list_containers(self, label: str) -> dict[str, str]:
+        with self.handle_errors():
+            containers = self.client.list_containers(filters={'label': [label]})
+
+        return {container['Names'][0].lstrip('/'): container['State'] for container in containers}
+
+    def exec(self, name: str, args: list[str], *, env=None, env_directory=None, capture_output=False):
+        with self.handle_errors():
+            return run_process(
+                args,
+                lambda stdout, stderr: self.client.exec_run(name, args, env=env, stdout=stdout, stderr=stderr),
+                capture_output=capture_output,
+            )
+
+
+def run_process(args: list[str], run, *, capture_output=False):
+    """
+    Call `run` with callbacks for chunks of standard output and standard error, which must return the
+    exit code, and return the equivalent of `subprocess.run` by either capturing or displaying the output.
+    """
+    if capture_output:
+        stdout_chunks: list[bytes] = []
+        stderr_chunks: list[bytes] = []
+        exit_code = run(stdout_chunks.append, stderr_chunks.append)
+
+        return subprocess.CompletedProcess(args, exit_code, b''.join(stdout_chunks), b''.join(stderr_chunks))
+
+    # The output is passed through unchanged as it may not be text at all
+    exit_code = run(write_bytes, lambda chunk: write_bytes(chunk, stream=sys.stderr))
+
+    return subprocess.CompletedProcess(args, exit_code)
+
+
+def write_env_file(directory, env: dict) -> str:
+    """
+    Write `env` to a new file in `directory` and return the path. The file is removed by `remove_env_files`
+    once the command using it has run, or otherwise when the process exits.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    prune_env_files(directory)
+
+    # Every command gets its own file so that concurrent commands never read each other's values, which
+    # may be secrets so the file is only readable by the current user
+    fd, path = tempfile.mkstemp(suffix='.env', prefix=f'{os.getpid()}_', dir=directory)
+    with open(fd, 'w', encoding='utf-8') as f:
+        f.write(''.join(f'{env_var}={value}\n' for env_var, value in env.items()))
+
+    ENV_FILES.add(path)
+    return path
+
+
+def remove_env_files(command: list[str]):
+    for option, value in zip(command, command[1:]):
+        if option == '--env-file':
+            remove_env_file(value)
+
+
+def remove_env_file(path: str):
+    ENV_FILES.discard(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def prune_env_files(directory):
+    # Processes that were killed could not remove their files
+    for entry in os.scandir(directory):
+        pid, _, _ = entry.name.partition('_')
+        if entry.name.endswith('.env') and pid.isdigit() and not pid_exists(int(pid)):
+            remove_env_file(entry.path)
+
+
+@atexit.register
+def remove_remaining_env_files():
+    # Commands that were constructed for Hatch to run have finished by now
+    for path in list(ENV_FILES):
+        remove_env_file(path)
+
+
+def write_text(text: str, stream=None):
+    # Always resolve the stream lazily as status displays temporarily replace the standard streams
+    if stream is None:
+        stream = sys.stdout
+
+    stream.write(text)
+    stream.flush()
+
+
+def write_bytes(data: bytes, stream=None):
+    if stream is None:
+        stream = sys.stdout
+
+    buffer = getattr(stream, 'buffer', None)
+    if buffer is None:
+        # Replacement streams may only accept text
+        write_text(data.decode('utf-8', errors='replace'), stream=stream)
+        return
+
+    # Anything already written as text must come first
+    stream.flush()
+    buffer.write(data)
+    buffer.flush()
+
+
+def get_backend(name: str, platform, verbosity: int, app) -> CLIBackend:
+    if name == 'api':
+        client = EngineClient.from_environment()
+        if client is not None and client.ping():
+            return EngineBackend(client, platform, verbosity, app)
+
+    return CLIBackend(platform, verbosity, app)
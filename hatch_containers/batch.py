@@ -0,0 +1,27 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hatch_containers.plugin import ContainerEnvironment
+
+
+def build_images(environments: list[ContainerEnvironment], max_workers: int):
+    """
+    Build the images required by the given environments concurrently, building each distinct image only once.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Images that bake dependencies are derived from the others so they must be built afterward
+        base_images = {environment.image: environment for environment in environments}
+        list(executor.map(lambda environment: environment.build_image(), base_images.values()))
+
+        dependency_images = {
+            environment.dependencies_image: environment
+            for environment in environments
+            if environment.use_dependencies_image
+        }
+        list(executor.map(lambda environment: environment.build_dependencies_image(), dependency_images.values()))
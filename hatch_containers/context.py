@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import io
+import tarfile
+from typing import Iterable, Iterator
+
+
+class ChunkWriter(io.BufferedIOBase):
+    """
+    A write-only file object that keeps what is written until it is drained.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        yield from chunks
+
+
+def get_sdist_files(root) -> list[tuple[str, str]]:
+    """
+    Return the path and relative distribution path of every file that would be included in the
+    project's source distribution, which respects VCS ignore files and build exclusions.
+    """
+    from hatchling.builders.sdist import SdistBuilder
+
+    builder = SdistBuilder(str(root))
+    return [(included_file.path, included_file.distribution_path) for included_file in builder.recurse_included_files()]
+
+
+def iter_archive(files: Iterable[tuple[str, str]], contents: dict[str, bytes] | None = None) -> Iterator[bytes]:
+    """
+    Yield chunks of an uncompressed tar archive containing `files`, pairs of paths and archive names,
+    and `contents`, which maps archive names to data, without ever holding the whole archive in memory.
+    """
+    writer = ChunkWriter()
+    with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for name, data in (contents or {}).items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+
+        for path, name in files:
+            tar.add(path, arcname=name, recursive=False, filter=reset_owner)
+            yield from writer.drain()
+
+    yield from writer.drain()
+
+
+def reset_owner(info: tarfile.TarInfo) -> tarfile.TarInfo:
+    # The host's user means nothing inside containers
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    return info
@@ -1,10 +1,17 @@
 # SPDX-FileCopyrightText: 2021-present Ofek Lev <oss@ofek.dev>
 #
 # SPDX-License-Identifier: MIT
+import json
+
+# Persist pip's cache between builds, which requires BuildKit
+PIP_CACHE_MOUNT = '--mount=type=cache,target=/root/.cache/pip'
+
 LINUX_TEMPLATE_ENVIRONMENT = """\
 FROM {base_image}
 
-RUN python -m pip install --disable-pip-version-check --upgrade virtualenv hatchling \
+LABEL hatch-containers="image"
+
+{run} python -m pip install --disable-pip-version-check --upgrade virtualenv hatchling \
  && python -m virtualenv /home/venv --no-download --no-periodic-update --pip embed
 
 ENV VIRTUAL_ENV="/home/venv" PATH="/home/venv/bin:$PATH"
@@ -15,19 +22,51 @@ WORKDIR /home/project
 LINUX_TEMPLATE_BUILDER = """\
 FROM {base_image}
 
-RUN python -m pip install --disable-pip-version-check --upgrade virtualenv \
+LABEL hatch-containers="image"
+
+{run} python -m pip install --disable-pip-version-check --upgrade virtualenv \
  && python -m virtualenv /home/venv --no-download --no-periodic-update --pip embed
 
 ENV VIRTUAL_ENV="/home/venv" PATH="/home/venv/bin:$PATH"
-
+{dependencies}
 WORKDIR /home/project
 
-COPY . /home/project
+COPY {source} /home/project
+"""
+
+LINUX_TEMPLATE_DEPENDENCIES = """\
+FROM {image}
+
+{run} {command}
 """
 
 
-def construct_dockerfile(base_image: str, *, builder=False):
+def construct_dockerfile(base_image: str, *, builder=False, source='.', dependencies=None, cache_mounts=False):
+    run = construct_run_instruction(cache_mounts=cache_mounts)
     if builder:
-        return LINUX_TEMPLATE_BUILDER.format(base_image=base_image)
+        # Build dependencies are installed before the source is copied so that their layer is only
+        # invalidated when they change
+        install = f'\n{run} {construct_install_command(sorted(dependencies))}\n' if dependencies else ''
+        return LINUX_TEMPLATE_BUILDER.format(base_image=base_image, source=source, dependencies=install, run=run)
     else:
-        return LINUX_TEMPLATE_ENVIRONMENT.format(base_image=base_image)
+        return LINUX_TEMPLATE_ENVIRONMENT.format(base_image=base_image, run=run)
+
+
+def construct_dependencies_dockerfile(image: str, dependencies: list[str], *, cache_mounts=False):
+    return LINUX_TEMPLATE_DEPENDENCIES.format(
+        image=image,
+        command=construct_install_command(dependencies),
+        run=construct_run_instruction(cache_mounts=cache_mounts),
+    )
+
+
+def construct_run_instruction(*, cache_mounts=False):
+    return f'RUN {PIP_CACHE_MOUNT}' if cache_mounts else 'RUN'
+
+
+def construct_install_command(dependencies: list[str]):
+    # Use the exec form so that requirements never need to be quoted for a shell
+    command = ['python', '-m', 'pip', 'install', '--disable-pip-version-check', '--no-python-version-warning']
+    command.extend(dependencies)
+
+    return json.dumps(command)
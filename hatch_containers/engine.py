@@ -0,0 +1,373 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET_PATH = '/var/run/docker.sock'
+# The newest version of the API the client knows, daemons that only support older versions are talked to in
+# their own version, like the `docker` executable does
+MAX_API_VERSION = '1.47'
+# The version assumed when the daemon does not say which it supports
+FALLBACK_API_VERSION = '1.24'
+
+
+class EngineError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections to a single socket that are shared by every environment in the process.
+    """
+
+    def __init__(self, socket_path: str, *, max_idle: int = 8):
+        self.socket_path = socket_path
+        self.max_idle = max_idle
+        self.__idle: list[UnixHTTPConnection] = []
+        self.__lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        with self.__lock:
+            connection = self.__idle.pop() if self.__idle else None
+
+        if connection is None:
+            connection = UnixHTTPConnection(self.socket_path)
+
+        reusable = False
+        try:
+            yield connection
+            reusable = connection.sock is not None
+        finally:
+            if reusable:
+                with self.__lock:
+                    if len(self.__idle) < self.max_idle:
+                        self.__idle.append(connection)
+                        connection = None
+
+            if connection is not None:
+                connection.close()
+
+    def close(self):
+        with self.__lock:
+            while self.__idle:
+                self.__idle.pop().close()
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_socket_path() -> str:
+    """
+    Return the path to the daemon's Unix socket as the `docker` executable would resolve it, or an empty
+    string if the daemon is not reachable that way e.g. when `DOCKER_HOST` or the active context points
+    to a TCP or SSH address.
+    """
+    docker_host = os.environ.get('DOCKER_HOST', '')
+    if not docker_host:
+        context = get_current_context()
+        if context == 'default':
+            return DEFAULT_SOCKET_PATH
+
+        docker_host = get_context_host(context)
+
+    if docker_host.startswith('unix://'):
+        return docker_host[7:]
+    else:
+        return ''
+
+
+def get_config_directory() -> str:
+    return os.environ.get('DOCKER_CONFIG') or os.path.join(os.path.expanduser('~'), '.docker')
+
+
+def get_current_context() -> str:
+    context = os.environ.get('DOCKER_CONTEXT', '')
+    if not context:
+        try:
+            with open(os.path.join(get_config_directory(), 'config.json'), encoding='utf-8') as f:
+                context = json.load(f).get('currentContext', '')
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    return context or 'default'
+
+
+def get_context_host(context: str) -> str:
+    """
+    Return the daemon address of a context created with `docker context create`, or an empty string
+    if it cannot be determined.
+    """
+    # The metadata of every context is stored in a directory named after the hash of its name
+    directory = hashlib.sha256(context.encode('utf-8')).hexdigest()
+    path = os.path.join(get_config_directory(), 'contexts', 'meta', directory, 'meta.json')
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['Endpoints']['docker']['Host']
+    except (OSError, ValueError, KeyError, TypeError):
+        return ''
+
+
+def get_pool(socket_path: str) -> ConnectionPool:
+    with _POOLS_LOCK:
+        if socket_path not in _POOLS:
+            _POOLS[socket_path] = ConnectionPool(socket_path)
+
+        return _POOLS[socket_path]
+
+
+class EngineClient:
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.pool = get_pool(socket_path)
+        self.api_version = ''
+
+    @classmethod
+    def from_environment(cls) -> EngineClient | None:
+        socket_path = get_socket_path()
+        if not socket_path or not os.path.exists(socket_path):
+            return None
+
+        return cls(socket_path)
+
+    def construct_url(self, path: str, query: dict | None = None, *, versioned=True) -> str:
+        url = f'/v{self.get_api_version()}{path}' if versioned else path
+        if query:
+            url += f'?{urlencode({k: v for k, v in query.items() if v is not None})}'
+
+        return url
+
+    def get_api_version(self) -> str:
+        if not self.api_version:
+            self.ping()
+
+        return self.api_version or FALLBACK_API_VERSION
+
+    @contextmanager
+    def stream(self, method: str, path: str, *, query=None, body=None, headers=None, versioned=True):
+        """
+        Send a request and yield the raw response, raising `EngineError` for error status codes.
+        """
+        request_headers = {'Host': 'docker'}
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+            request_headers['Content-Type'] = 'application/json'
+        if headers:
+            request_headers.update(headers)
+
+        url = self.construct_url(path, query, versioned=versioned)
+        with self.pool.connection() as connection:
+            try:
+                connection.request(method, url, body=body, headers=request_headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The daemon closed an idle keep-alive connection, retry once on a fresh one
+                connection.close()
+                connection.request(method, url, body=body, headers=request_headers)
+                response = connection.getresponse()
+
+            try:
+                if response.status >= 400:
+                    raise EngineError(response.status, self.get_error_message(response.read()))
+
+                yield response
+
+                # Drain whatever the caller did not consume so the connection may be reused
+                response.read()
+            finally:
+                if response.will_close:
+                    connection.close()
+
+    def request(self, method: str, path: str, **kwargs):
+        with self.stream(method, path, **kwargs) as response:
+            data = response.read()
+
+        if data and response.getheader('Content-Type', '').startswith('application/json'):
+            return json.loads(data)
+
+        return data
+
+    @staticmethod
+    def get_error_message(data: bytes) -> str:
+        try:
+            return json.loads(data)['message']
+        except Exception:
+            return data.decode('utf-8', errors='replace').strip()
+
+    def ping(self) -> bool:
+        """
+        Check that the daemon is reachable and negotiate the version of the API to use, which is why
+        the request itself is not versioned.
+        """
+        try:
+            with self.stream('GET', '/_ping', versioned=False) as response:
+                reachable = response.read() == b'OK'
+                daemon_version = response.getheader('API-Version', '')
+        except (OSError, EngineError):
+            return False
+
+        self.api_version = negotiate_api_version(daemon_version)
+        return reachable
+
+    def build(self, tag: str, context, *, dockerfile='Dockerfile', pull=True, output=None):
+        query = {'t': tag, 'dockerfile': dockerfile, 'pull': '1' if pull else None}
+        headers = {'Content-Type': 'application/x-tar'}
+        with self.stream('POST', '/build', query=query, body=context, headers=headers) as response:
+            for line in iter(response.readline, b''):
+                if not line.strip():
+                    continue
+
+                message = json.loads(line)
+                if 'error' in message:
+                    raise EngineError(500, message['error'].strip())
+                elif output is not None and 'stream' in message:
+                    output(message['stream'])
+
+    def inspect_image(self, name: str) -> dict | None:
+        try:
+            return self.request('GET', f'/images/{quote(name)}/json')
+        except EngineError as e:
+            if e.status == 404:
+                return None
+
+            raise
+
+    def remove_volume(self, name: str):
+        self.request('DELETE', f'/volumes/{quote(name)}')
+
+    def remove_image(self, name: str):
+        self.request('DELETE', f'/images/{quote(name)}')
+
+    def prune_images(self, *, filters: dict | None = None):
+        # Only images without a name are removed
+        query = {'filters': json.dumps(filters)} if filters else None
+        self.request('POST', '/images/prune', query=query)
+
+    def commit_container(self, name: str, repository: str, tag: str):
+        self.request('POST', '/commit', query={'container': name, 'repo': repository, 'tag': tag})
+
+    def create_container(self, name: str, config: dict) -> str:
+        return self.request('POST', '/containers/create', query={'name': name}, body=config)['Id']
+
+    def start_container(self, name: str):
+        self.request('POST', f'/containers/{quote(name)}/start')
+
+    def stop_container(self, name: str, *, timeout=0):
+        self.request('POST', f'/containers/{quote(name)}/stop', query={'t': timeout})
+
+    def pause_container(self, name: str):
+        self.request('POST', f'/containers/{quote(name)}/pause')
+
+    def unpause_container(self, name: str):
+        self.request('POST', f'/containers/{quote(name)}/unpause')
+
+    def inspect_container(self, name: str) -> dict | None:
+        try:
+            return self.request('GET', f'/containers/{quote(name)}/json')
+        except EngineError as e:
+            if e.status == 404:
+                return None
+
+            raise
+
+    def remove_container(self, name: str, *, force=False):
+        query = {'force': '1'} if force else None
+        self.request('DELETE', f'/containers/{quote(name)}', query=query)
+
+    def put_archive(self, name: str, path: str, archive):
+        # Iterables of chunks are sent with chunked transfer encoding
+        headers = {'Content-Type': 'application/x-tar'}
+        self.request('PUT', f'/containers/{quote(name)}/archive', query={'path': path}, body=archive, headers=headers)
+
+    def list_containers(self, *, filters: dict | None = None, all_containers=True) -> list[dict]:
+        query = {'all': '1' if all_containers else '0'}
+        if filters:
+            query['filters'] = json.dumps(filters)
+
+        return self.request('GET', '/containers/json', query=query)
+
+    def exec_run(self, name: str, args: list[str], *, env: dict | None = None, stdout=None, stderr=None) -> int:
+        """
+        Run a command inside a running container, passing each chunk of output to the `stdout`
+        and `stderr` callbacks as it arrives, and return the command's exit code.
+        """
+        config = {
+            'AttachStdout': True,
+            'AttachStderr': True,
+            'Tty': False,
+            'Cmd': args,
+            'Env': [f'{key}={value}' for key, value in (env or {}).items()],
+        }
+        exec_id = self.request('POST', f'/containers/{quote(name)}/exec', body=config)['Id']
+
+        with self.stream('POST', f'/exec/{exec_id}/start', body={'Detach': False, 'Tty': False}) as response:
+            for stream_type, chunk in iter_frames(response):
+                callback = stderr if stream_type == 2 else stdout
+                if callback is not None:
+                    callback(chunk)
+
+        while True:
+            info = self.request('GET', f'/exec/{exec_id}/json')
+            if not info['Running']:
+                return info['ExitCode']
+
+            time.sleep(0.001)
+
+
+def negotiate_api_version(daemon_version: str) -> str:
+    try:
+        parsed_version = parse_api_version(daemon_version)
+    except ValueError:
+        return FALLBACK_API_VERSION
+
+    if parsed_version < parse_api_version(MAX_API_VERSION):
+        return daemon_version
+
+    return MAX_API_VERSION
+
+
+def parse_api_version(version: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in version.split('.'))
+
+
+def iter_frames(response):
+    """
+    Demultiplex the stream returned when attaching to a process that has no TTY.
+    Every frame has an 8-byte header: the stream type, 3 bytes of padding, and the big-endian payload size.
+    """
+    while True:
+        header = response.read(8)
+        if len(header) < 8:
+            return
+
+        size = int.from_bytes(header[4:], 'big')
+        payload = response.read(size)
+        yield header[0], payload
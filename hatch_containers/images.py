@@ -0,0 +1,179 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import os
+import re
+import time
+
+import click
+
+from hatch_containers.backends import CONTAINER_LABEL, get_backend
+from hatch_containers.utils import file_lock, load_json, save_json
+
+SIZE_UNITS = {
+    '': 1,
+    'b': 1,
+    'kb': 1000,
+    'mb': 1000**2,
+    'gb': 1000**3,
+    'tb': 1000**4,
+    'kib': 1024,
+    'mib': 1024**2,
+    'gib': 1024**3,
+    'tib': 1024**4,
+}
+
+
+def parse_size(size: str) -> int:
+    """
+    Return the number of bytes of a size such as `512MB` or `10GiB`, raising `ValueError` if it is invalid.
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*', size)
+    if match is None or match.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(size)
+
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+class ImageUsage:
+    """
+    Records when each image created by the plugin was last used, shared by all processes.
+
+    The directory contains `usage.json`, which maps image names to timestamps, and `lock`, which is held
+    while the former is updated or images are being collected.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        self.path = os.path.join(directory, 'usage.json')
+        self.lock_file = os.path.join(directory, 'lock')
+
+    def lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return file_lock(self.lock_file)
+
+    def load(self) -> dict[str, float]:
+        return load_json(self.path)
+
+    def touch(self, *images: str):
+        with self.lock():
+            usage = self.load()
+            now = time.time()
+            for image in images:
+                usage[image] = now
+
+            save_json(self.path, usage)
+
+    def forget(self, images):
+        usage = self.load()
+        for image in images:
+            usage.pop(image, None)
+
+        save_json(self.path, usage)
+
+
+def is_in_use(image: str, image_id: str, in_use: set[str]) -> bool:
+    # Containers refer to images by the name they were created with, or by a possibly truncated ID if the
+    # name has since been given to another image
+    digest = image_id.split(':', 1)[-1]
+    return any(
+        reference in (image, image_id) or (len(reference) >= 12 and digest.startswith(reference))
+        for reference in in_use
+    )
+
+
+def select_images(usage: dict[str, float], images: dict[str, tuple[str, int]], in_use: set[str], budget: int):
+    """
+    Return the least recently used images that must be removed for the total size of `images`, which maps
+    names to IDs and sizes, to fit within `budget` bytes. Images that are in use are never selected and
+    images with the same ID are always selected together.
+    """
+    sizes = dict(images.values())
+    total = sum(sizes.values())
+
+    # Images are as recent as the most recent use of any of their names
+    last_used: dict[str, float] = {}
+    names: dict[str, list[str]] = {}
+    for image, (image_id, _) in images.items():
+        last_used[image_id] = max(last_used.get(image_id, 0), usage.get(image, 0))
+        names.setdefault(image_id, []).append(image)
+
+    selected: list[str] = []
+    for image_id in sorted(last_used, key=last_used.__getitem__):
+        if total <= budget:
+            break
+        elif any(is_in_use(image, image_id, in_use) for image in names[image_id]):
+            continue
+
+        selected.extend(names[image_id])
+        total -= sizes[image_id]
+
+    return selected
+
+
+def collect_images(docker, usage: ImageUsage, budget: int) -> list[str]:
+    """
+    Remove the least recently used images created by the plugin until they fit within `budget` bytes,
+    along with any of their untagged predecessors, and return the names of the removed images.
+
+    Sizes include layers that are shared between images so the budget is met conservatively.
+    """
+    with usage.lock():
+        recorded = usage.load()
+        images = docker.inspect_images(sorted(recorded))
+
+        selected = select_images(recorded, images, docker.container_images(), budget)
+        if selected:
+            docker.remove_images(selected)
+
+        # Rebuilt images leave behind their previous versions without a name
+        docker.prune_images(CONTAINER_LABEL)
+
+        usage.forget([image for image in recorded if image not in images or image in selected])
+
+    return selected
+
+
+def get_data_directory() -> str:
+    """
+    Return the directory where Hatch stores the data of container environments, like `hatch` would.
+    """
+    from hatch.config.constants import ConfigEnvVars
+    from hatch.config.model import RootConfig
+    from hatch.config.user import ConfigFile
+    from hatch.utils.toml import load_toml_data
+
+    config_file = ConfigFile()
+    config = RootConfig(load_toml_data(config_file.read()) if config_file.path.is_file() else {})
+
+    directory = config.dirs.env.get('container')
+    if directory:
+        return os.path.expanduser(os.path.expandvars(directory))
+
+    return os.path.join(os.environ.get(ConfigEnvVars.DATA) or config.dirs.data, 'env', 'container')
+
+
+@click.command()
+@click.option('--budget', required=True, help='The disk space that images may use e.g. `10GB`')
+@click.option('--data-dir', help='The data directory of container environments, by default that of Hatch')
+def main(budget, data_dir):
+    """
+    Remove the least recently used images created by the plugin until they fit within the budget.
+    """
+    from hatch.utils.platform import Platform
+
+    try:
+        budget = parse_size(budget)
+    except ValueError:
+        raise click.BadParameter(f'invalid size: {budget}', param_hint='--budget') from None
+
+    usage = ImageUsage(os.path.join(data_dir or get_data_directory(), 'images'))
+    for image in collect_images(get_backend('cli', Platform(), 0, None), usage, budget):
+        click.echo(f'Removed image: {image}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+
+from hatch_containers.trace import get_tracer
+from hatch_containers.utils import file_lock, pid_exists
+
+
+class KeepAlive:
+    """
+    Coordinates a container that stays running between commands until it has been idle for `timeout` seconds.
+
+    The container's directory contains:
+
+    - `lock`, which is held while deciding whether the container must be started or stopped
+    - `last-used`, which is modified whenever a process stops using the container
+    - `leases/<PID>`, one for every process that is currently using the container
+    - `reaper.pid`, the process that stops the container once it becomes idle
+
+    The container is only assumed to be running while a reaper is watching it. If `remove` is true then the
+    reaper removes the idle container rather than stopping it. If `trace` is set then the reaper records
+    how long that takes in the trace file.
+    """
+
+    def __init__(self, directory, container_name: str, timeout: int, *, remove=False, trace='', trace_format='jsonl'):
+        self.directory = directory
+        self.container_name = container_name
+        self.timeout = timeout
+        self.remove = remove
+        self.trace = trace
+        self.trace_format = trace_format
+
+        self.lock_file = os.path.join(directory, 'lock')
+        self.last_used_file = os.path.join(directory, 'last-used')
+        self.leases_directory = os.path.join(directory, 'leases')
+        self.reaper_file = os.path.join(directory, 'reaper.pid')
+
+    @property
+    def lease_file(self):
+        return os.path.join(self.leases_directory, str(os.getpid()))
+
+    def acquire(self, start, running=None):
+        """
+        Use the container, calling `start` unless a reaper is watching it and `running`, if set, confirms that
+        it was not stopped by something else such as a restart of the daemon.
+        """
+        os.makedirs(self.leases_directory, exist_ok=True)
+        with file_lock(self.lock_file):
+            touch(self.lease_file)
+            if not self.reaper_running() or (running is not None and not running()):
+                start()
+
+    def release(self):
+        with file_lock(self.lock_file):
+            touch(self.last_used_file)
+            remove_file(self.lease_file)
+            if not self.reaper_running():
+                self.spawn_reaper()
+
+    def reaper_pid(self) -> int:
+        try:
+            with open(self.reaper_file, encoding='utf-8') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def reaper_running(self) -> bool:
+        pid = self.reaper_pid()
+        return bool(pid) and pid_exists(pid)
+
+    def spawn_reaper(self):
+        kwargs: dict = {}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+
+        command = [
+            sys.executable,
+            '-m',
+            'hatch_containers.keepalive',
+            self.directory,
+            self.container_name,
+            str(self.timeout),
+        ]
+        if self.remove:
+            command.append('--remove')
+        if self.trace:
+            command.extend(('--trace', self.trace, '--trace-format', self.trace_format))
+
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs,
+        )
+
+    def active_leases(self) -> int:
+        active = 0
+        for entry in os.scandir(self.leases_directory):
+            if entry.name.isdigit() and pid_exists(int(entry.name)):
+                active += 1
+            else:
+                # The process exited without releasing the container
+                remove_file(entry.path)
+
+        return active
+
+    def reap(self):
+        with file_lock(self.lock_file):
+            if self.reaper_running():
+                return
+
+            with open(self.reaper_file, 'w', encoding='utf-8') as f:
+                f.write(str(os.getpid()))
+
+        try:
+            while True:
+                # The environment has been removed
+                if not os.path.isdir(self.leases_directory):
+                    return
+
+                with file_lock(self.lock_file):
+                    if self.active_leases():
+                        wait = self.timeout
+                    else:
+                        try:
+                            idle = time.time() - os.path.getmtime(self.last_used_file)
+                        except OSError:
+                            idle = self.timeout
+
+                        if idle >= self.timeout:
+                            self.stop()
+                            remove_file(self.reaper_file)
+                            return
+
+                        wait = self.timeout - idle
+
+                time.sleep(max(wait, 1))
+        finally:
+            if self.reaper_pid() == os.getpid():
+                remove_file(self.reaper_file)
+
+    def stop(self):
+        if self.remove:
+            operation = 'remove'
+            command = ['docker', 'rm', '--force', self.container_name]
+        else:
+            operation = 'stop'
+            command = ['docker', 'stop', '--time', '0', self.container_name]
+
+        with self.span(operation) as fields:
+            process = subprocess.run(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            fields['exit_code'] = process.returncode
+
+    def span(self, operation: str):
+        if not self.trace:
+            return nullcontext({})
+
+        return get_tracer(self.trace, self.trace_format).span(operation, target=self.container_name, reaper=True)
+
+
+def touch(path):
+    with open(path, 'w', encoding='utf-8'):
+        pass
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='hatch_containers.keepalive')
+    parser.add_argument('directory')
+    parser.add_argument('container_name')
+    parser.add_argument('timeout', type=int)
+    parser.add_argument('--remove', action='store_true')
+    parser.add_argument('--trace', default='')
+    parser.add_argument('--trace-format', default='jsonl')
+    args = parser.parse_args()
+
+    KeepAlive(
+        args.directory,
+        args.container_name,
+        args.timeout,
+        remove=args.remove,
+        trace=args.trace,
+        trace_format=args.trace_format,
+    ).reap()
+
+
+if __name__ == '__main__':
+    main()
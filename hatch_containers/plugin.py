@@ -3,15 +3,97 @@
 # SPDX-License-Identifier: MIT
 from __future__ import annotations
 
+import os
 import re
+import shutil
 import sys
-from contextlib import contextmanager
+import threading
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
 
+import click
+from hatch.config.constants import AppEnvVars
 from hatch.env.plugin.interface import EnvironmentInterface
 from hatch.utils.fs import Path, temp_directory
 from hatch.utils.structures import EnvVars
 
-from hatch_containers.dockerfile import construct_dockerfile
+from hatch_containers import agent
+from hatch_containers.backends import CONTAINER_LABEL, get_backend, run_process
+from hatch_containers.batch import build_images
+from hatch_containers.context import get_sdist_files, iter_archive
+from hatch_containers.dockerfile import construct_dependencies_dockerfile, construct_dockerfile
+from hatch_containers.images import ImageUsage, collect_images, parse_size
+from hatch_containers.keepalive import KeepAlive
+from hatch_containers.pool import BuilderPool
+from hatch_containers.trace import TracedBackend, get_tracer
+from hatch_containers.utils import file_lock, fingerprint, load_json, save_json
+
+# Containers are started at most once per process no matter how many times, or by how many instances,
+# they are activated and are only stopped once the invoked command finishes
+ACTIVATIONS: dict[str, int] = {}
+STARTED_CONTAINERS: dict[str, ContainerEnvironment] = {}
+ACTIVATION_LOCK = threading.RLock()
+
+# Images that are known to be up to date for the remainder of the process
+BUILT_IMAGES: set[str] = set()
+RESOLVED_IMAGES: set[str] = set()
+
+# The status of every container of the plugin, which is queried at most once per process and then kept up to
+# date as containers are created, started, stopped and removed
+CONTAINER_STATES: dict[str, str] = {}
+CONTAINER_STATES_QUERIED = threading.Event()
+CONTAINER_STATES_LOCK = threading.Lock()
+
+# Containers and volumes of removed environments are deleted together once the current Hatch command finishes
+PENDING_REMOVALS: dict[str, tuple[list[str], list[str]]] = {}
+PENDING_REMOVALS_LOCK = threading.Lock()
+
+
+def release_container(container_name: str):
+    with ACTIVATION_LOCK:
+        if ACTIVATIONS.get(container_name):
+            return
+
+        environment = STARTED_CONTAINERS.pop(container_name, None)
+
+    if environment is not None:
+        environment.release()
+
+
+def remove_pending(docker):
+    with PENDING_REMOVALS_LOCK:
+        removals = list(PENDING_REMOVALS.values())
+        PENDING_REMOVALS.clear()
+
+    if not removals:
+        return
+
+    # Every environment talks to the same daemon so any of their backends will do
+    docker.remove_containers([container for containers, _ in removals for container in containers])
+
+    volumes = [volume for _, volumes in removals for volume in volumes]
+    if volumes:
+        docker.remove_volumes(volumes)
+
+
+def prepare_staging_directory(staging_dir: Path):
+    # Only the contents are removed as the directory may be mounted in a running container
+    staging_dir.ensure_dir_exists()
+    for entry in staging_dir.iterdir():
+        entry.remove()
+
+
+def owned_by_current_user(directory: Path) -> bool:
+    uid = os.getuid()
+    return all(entry.stat().st_uid == uid for entry in directory.iterdir())
+
+
+def move_file(source: Path, destination: Path):
+    try:
+        # This is free when the staging and output directories are on the same file system
+        source.replace(destination)
+    except OSError:
+        shutil.move(str(source), str(destination))
 
 
 class ContainerEnvironment(EnvironmentInterface):
@@ -24,7 +106,32 @@ class ContainerEnvironment(EnvironmentInterface):
         self.__config_command = None
         self.__config_start_on_creation = None
         self.__config_shell = None
+        self.__config_backend = None
+        self.__config_exec_agent = None
+        self.__config_bake_dependencies = None
+        self.__config_installer_cache = None
+        self.__config_keep_alive = None
+        self.__config_suspend = None
+        self.__config_build_workers = None
+        self.__config_builder_pool = None
+        self.__config_builder_pool_ttl = None
+        self.__config_build_context = None
+        self.__config_buildkit_cache = None
+        self.__config_image_pull = None
+        self.__config_snapshot = None
+        self.__config_venv_volume = None
+        self.__config_keep_venv_volume = None
+        self.__config_trace = None
+        self.__config_trace_format = None
+        self.__config_image_budget = None
         self.__python_version = None
+        self.__docker = None
+        self.__agent_available: bool | None = None
+        self.__builder_container_name = ''
+        self.__build_trace: ExitStack | None = None
+        self.__container_env_vars: dict | None = None
+        self.__exec_env_vars: dict | None = None
+        self.__snapshot_image = ''
 
         self.base_image = self.config_image.format(version=self.python_version)
         self.base_image_id = re.sub(r'[^\w.-]', '_', self.base_image)
@@ -33,10 +140,48 @@ class ContainerEnvironment(EnvironmentInterface):
         self.container_name = f'{self.metadata.core.name}_{self.name}'
         self.builder_container_name = f'{self.container_name}_builder'
         self.project_path = '/home/project'
+        self.agent_directory = self.data_directory / 'agents' / self.container_name
+        self.agent_path = '/home/hatch-agent'
+        self.agent_unavailable_file = self.agent_directory / 'unavailable'
+        self.cache_path = '/home/cache'
+        self.venv_path = '/home/venv'
+        self.builder_artifact_path = f'{self.project_path}/dist'
+        self.keep_alive_directory = self.data_directory / 'keep-alive' / self.container_name
+        self.state_file = self.data_directory / 'state' / f'{self.container_name}.json'
+        self.unlabeled_checked_file = self.data_directory / 'state' / f'{self.container_name}.labeled'
+        self.builder_lock_file = self.data_directory / 'locks' / f'{self.builder_container_name}.lock'
+        self.builder_staging_directory = self.data_directory / 'artifacts' / self.builder_container_name
+        self.pull_directory = self.data_directory / 'pulls'
+        self.env_directory = self.data_directory / 'env' / self.container_name
+        self.env_key_file = self.env_directory / 'key'
+        self.image_usage = ImageUsage(str(self.data_directory / 'images'))
 
     @staticmethod
     def get_option_types():
-        return {'image': str, 'command': list, 'start-on-creation': bool, 'shell': str}
+        return {
+            'image': str,
+            'command': list,
+            'start-on-creation': bool,
+            'shell': str,
+            'backend': str,
+            'exec-agent': bool,
+            'bake-dependencies': bool,
+            'installer-cache': str,
+            'keep-alive': int,
+            'suspend': str,
+            'build-workers': int,
+            'builder-pool': int,
+            'builder-pool-ttl': int,
+            'build-context': str,
+            'buildkit-cache': bool,
+            'image-pull': str,
+            'snapshot': bool,
+            'venv-volume': bool,
+            'keep-venv-volume': bool,
+            'trace': str,
+            'trace-format': str,
+            'image-budget': str,
+        }
 
     @property
     def config_image(self):
@@ -92,6 +237,329 @@ class ContainerEnvironment(EnvironmentInterface):
 
         return self.__config_shell
 
+    @property
+    def config_backend(self):
+        if self.__config_backend is None:
+            backend = self.config.get('backend', 'cli')
+            if not isinstance(backend, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.backend` must be a string')
+            elif backend not in ('cli', 'api'):
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.backend` must be one of: cli, api')
+
+            self.__config_backend = backend
+
+        return self.__config_backend
+
+    @property
+    def config_exec_agent(self):
+        if self.__config_exec_agent is None:
+            exec_agent = self.config.get('exec-agent', False)
+            if not isinstance(exec_agent, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.exec-agent` must be a boolean')
+
+            # The agent is what containers run
+            if exec_agent and 'command' in self.config:
+                raise ValueError(
+                    f'Field `tool.hatch.envs.{self.name}.exec-agent` must not be enabled when field '
+                    f'`tool.hatch.envs.{self.name}.command` is set'
+                )
+
+            self.__config_exec_agent = exec_agent
+
+        return self.__config_exec_agent
+
+    @property
+    def config_bake_dependencies(self):
+        if self.__config_bake_dependencies is None:
+            bake_dependencies = self.config.get('bake-dependencies', False)
+            if not isinstance(bake_dependencies, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.bake-dependencies` must be a boolean')
+
+            self.__config_bake_dependencies = bake_dependencies
+
+        return self.__config_bake_dependencies
+
+    @property
+    def config_installer_cache(self):
+        if self.__config_installer_cache is None:
+            installer_cache = self.config.get('installer-cache', 'hatch-containers-cache')
+            if not isinstance(installer_cache, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.installer-cache` must be a string')
+
+            # Anything that looks like a path is a host directory rather than the name of a volume
+            if installer_cache.startswith(('.', '~')) or '/' in installer_cache or '\\' in installer_cache:
+                installer_cache = str((self.root / Path(installer_cache).expanduser()).resolve())
+
+            self.__config_installer_cache = installer_cache
+
+        return self.__config_installer_cache
+
+    @property
+    def installer_cache_volumes(self):
+        if not self.config_installer_cache:
+            return []
+
+        return [f'{self.config_installer_cache}:{self.cache_path}']
+
+    @property
+    def installer_cache_env_vars(self):
+        if not self.config_installer_cache:
+            return {}
+
+        return {'PIP_CACHE_DIR': f'{self.cache_path}/pip', 'UV_CACHE_DIR': f'{self.cache_path}/uv'}
+
+    @property
+    def config_keep_alive(self):
+        if self.__config_keep_alive is None:
+            keep_alive = self.config.get('keep-alive', 0)
+            if not isinstance(keep_alive, int) or isinstance(keep_alive, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.keep-alive` must be an integer')
+            elif keep_alive < 0:
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.keep-alive` must not be negative')
+
+            self.__config_keep_alive = keep_alive
+
+        return self.__config_keep_alive
+
+    @property
+    def config_suspend(self):
+        if self.__config_suspend is None:
+            suspend = self.config.get('suspend', 'stop')
+            if not isinstance(suspend, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.suspend` must be a string')
+            elif suspend not in ('stop', 'pause'):
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.suspend` must be one of: stop, pause')
+
+            self.__config_suspend = suspend
+
+        return self.__config_suspend
+
+    @property
+    def config_build_workers(self):
+        if self.__config_build_workers is None:
+            build_workers = self.config.get('build-workers', 1)
+            if not isinstance(build_workers, int) or isinstance(build_workers, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.build-workers` must be an integer')
+            elif build_workers < 1:
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.build-workers` must be at least 1')
+
+            self.__config_build_workers = build_workers
+
+        return self.__config_build_workers
+
+    @property
+    def config_builder_pool(self):
+        if self.__config_builder_pool is None:
+            builder_pool = self.config.get('builder-pool', 0)
+            if not isinstance(builder_pool, int) or isinstance(builder_pool, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.builder-pool` must be an integer')
+            elif builder_pool < 0:
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.builder-pool` must not be negative')
+
+            self.__config_builder_pool = builder_pool
+
+        return self.__config_builder_pool
+
+    @property
+    def config_builder_pool_ttl(self):
+        if self.__config_builder_pool_ttl is None:
+            builder_pool_ttl = self.config.get('builder-pool-ttl', 600)
+            if not isinstance(builder_pool_ttl, int) or isinstance(builder_pool_ttl, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.builder-pool-ttl` must be an integer')
+            elif builder_pool_ttl < 1:
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.builder-pool-ttl` must be at least 1')
+
+            self.__config_builder_pool_ttl = builder_pool_ttl
+
+        return self.__config_builder_pool_ttl
+
+    @property
+    def config_build_context(self):
+        if self.__config_build_context is None:
+            # Version sources other than the built-in ones, such as VCS tags, may need files that are not
+            # in the source distribution and only end up in its generated `PKG-INFO`
+            default_build_context = 'sdist'
+            if 'version' in self.metadata.config.get('project', {}).get('dynamic', []):
+                if self.metadata.hatch.version.source_name not in ('regex', 'code', 'env'):
+                    default_build_context = 'project'
+
+            build_context = self.config.get('build-context', default_build_context)
+            if not isinstance(build_context, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.build-context` must be a string')
+            elif build_context not in ('sdist', 'project'):
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.build-context` must be one of: sdist, project')
+
+            self.__config_build_context = build_context
+
+        return self.__config_build_context
+
+    @property
+    def config_buildkit_cache(self):
+        if self.__config_buildkit_cache is None:
+            buildkit_cache = self.config.get('buildkit-cache', False)
+            if not isinstance(buildkit_cache, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.buildkit-cache` must be a boolean')
+
+            self.__config_buildkit_cache = buildkit_cache
+
+        return self.__config_buildkit_cache
+
+    @property
+    def config_image_pull(self):
+        if self.__config_image_pull is None:
+            image_pull = self.config.get('image-pull', 'daily')
+            if not isinstance(image_pull, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.image-pull` must be a string')
+            elif image_pull not in ('always', 'daily', 'missing', 'never'):
+                raise ValueError(
+                    f'Field `tool.hatch.envs.{self.name}.image-pull` must be one of: always, daily, missing, never'
+                )
+
+            self.__config_image_pull = image_pull
+
+        return self.__config_image_pull
+
+    @property
+    def config_snapshot(self):
+        if self.__config_snapshot is None:
+            snapshot = self.config.get('snapshot', False)
+            if not isinstance(snapshot, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.snapshot` must be a boolean')
+
+            self.__config_snapshot = snapshot
+
+        return self.__config_snapshot
+
+    @property
+    def config_venv_volume(self):
+        if self.__config_venv_volume is None:
+            venv_volume = self.config.get('venv-volume', False)
+            if not isinstance(venv_volume, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.venv-volume` must be a boolean')
+
+            self.__config_venv_volume = venv_volume
+
+        return self.__config_venv_volume
+
+    @property
+    def config_keep_venv_volume(self):
+        if self.__config_keep_venv_volume is None:
+            keep_venv_volume = self.config.get('keep-venv-volume', False)
+            if not isinstance(keep_venv_volume, bool):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.keep-venv-volume` must be a boolean')
+
+            self.__config_keep_venv_volume = keep_venv_volume
+
+        return self.__config_keep_venv_volume
+
+    @property
+    def config_trace(self):
+        if self.__config_trace is None:
+            trace = self.config.get('trace', '')
+            if not isinstance(trace, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.trace` must be a string')
+
+            if trace:
+                trace = str((self.root / Path(trace).expanduser()).resolve())
+
+            self.__config_trace = trace
+
+        return self.__config_trace
+
+    @property
+    def config_trace_format(self):
+        if self.__config_trace_format is None:
+            trace_format = self.config.get('trace-format', 'jsonl')
+            if not isinstance(trace_format, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.trace-format` must be a string')
+            elif trace_format not in ('jsonl', 'chrome'):
+                raise ValueError(f'Field `tool.hatch.envs.{self.name}.trace-format` must be one of: jsonl, chrome')
+
+            self.__config_trace_format = trace_format
+
+        return self.__config_trace_format
+
+    @property
+    def config_image_budget(self):
+        if self.__config_image_budget is None:
+            image_budget = self.config.get('image-budget', '')
+            if not isinstance(image_budget, str):
+                raise TypeError(f'Field `tool.hatch.envs.{self.name}.image-budget` must be a string')
+
+            try:
+                self.__config_image_budget = parse_size(image_budget) if image_budget else 0
+            except ValueError:
+                raise ValueError(
+                    f'Field `tool.hatch.envs.{self.name}.image-budget` must be a size such as `10GB`'
+                ) from None
+
+        return self.__config_image_budget
+
+    @property
+    def tracer(self):
+        if not self.config_trace:
+            return None
+
+        return get_tracer(self.config_trace, self.config_trace_format)
+
+    @property
+    def venv_volume(self):
+        key = fingerprint(self.base_image, self.dependencies_hash)
+        name = re.sub(r'[^\w.-]', '_', self.container_name)
+        return f'{name}_venv_{key[:16]}'
+
+    @property
+    def snapshot_image(self):
+        # Snapshots are only valid for the exact image and dependencies they were taken with, neither of
+        # which change after the image has been built during creation
+        if not self.__snapshot_image:
+            key = fingerprint(self.docker.image_id(self.image), self.dependencies_hash)
+            repository = re.sub(r'[^a-z0-9._-]', '-', self.container_name.lower())
+            self.__snapshot_image = f'{repository}:hatch-snapshot-{key[:16]}'
+
+        return self.__snapshot_image
+
+    @property
+    def use_buildkit(self):
+        # Fall back to the classic builder, without cache mounts, when BuildKit is unavailable
+        return self.config_buildkit_cache and self.docker.buildkit_available()
+
+    @property
+    def keep_alive(self):
+        return KeepAlive(
+            str(self.keep_alive_directory),
+            self.container_name,
+            self.config_keep_alive,
+            trace=self.config_trace,
+            trace_format=self.config_trace_format,
+        )
+
+    @property
+    def dependencies_hash(self):
+        return fingerprint(*sorted(self.dependencies))
+
+    @property
+    def use_dependencies_image(self):
+        # Image builds do not see the environment variables, which may configure package indexes and their
+        # credentials, so the dependencies are then synchronized in the container like usual
+        return self.config_bake_dependencies and bool(self.dependencies) and not self.has_custom_env_vars()
+
+    @property
+    def dependencies_image(self):
+        # Only the dependencies determine the tag so that environments of all projects may share images
+        return f'{self.base_image.replace(":", "_")}:hatch-deps-{self.dependencies_hash[:16]}'
+
+    @property
+    def docker(self):
+        if self.__docker is None:
+            docker = get_backend(self.config_backend, self.platform, self.verbosity, self.app)
+            if self.tracer is not None:
+                docker = TracedBackend(docker, self.tracer, environment=self.name, image=self.image)
+
+            self.__docker = docker
+
+        return self.__docker
+
     @property
     def python_version(self):
         if self.__python_version is None:
@@ -105,90 +573,451 @@ class ContainerEnvironment(EnvironmentInterface):
 
         return self.__python_version
 
+    def trace(self, operation: str, target: str = ''):
+        """
+        Record the duration of a Docker operation that does not go through the backend, if tracing is enabled.
+        """
+        tracer = self.tracer
+        if tracer is None:
+            return nullcontext({})
+
+        return tracer.span(operation, environment=self.name, image=self.image, target=target)
+
     def _activate(self):
-        self.platform.check_command_output(['docker', 'start', self.container_name])
+        if self.config_suspend == 'pause':
+            status = self.container_status()
+            if status == 'paused':
+                self.docker.unpause(self.container_name)
+                self.set_container_status('running')
+                return
+            elif status == 'running':
+                return
+
+        self.docker.start(self.container_name)
+        self.set_container_status('running')
 
     def _deactivate(self):
-        self.platform.check_command_output(['docker', 'stop', '--time', '0', self.container_name])
+        if self.config_suspend == 'pause':
+            self.docker.pause(self.container_name)
+            self.set_container_status('paused')
+        else:
+            self.docker.stop(self.container_name)
+            self.set_container_status('exited')
+
+    def get_container_states(self) -> dict[str, str]:
+        with CONTAINER_STATES_LOCK:
+            if not CONTAINER_STATES_QUERIED.is_set():
+                # A single query covers every environment, no matter how many are checked
+                CONTAINER_STATES.update(self.docker.list_containers(CONTAINER_LABEL))
+                CONTAINER_STATES_QUERIED.set()
+
+            return CONTAINER_STATES
+
+    def container_status(self) -> str:
+        # Containers that are kept alive are also stopped by other processes
+        if self.config_keep_alive:
+            return self.docker.status(self.container_name)
+
+        return self.get_container_states().get(self.container_name, '')
+
+    def set_container_status(self, status: str):
+        with CONTAINER_STATES_LOCK:
+            if status:
+                CONTAINER_STATES[self.container_name] = status
+            else:
+                CONTAINER_STATES.pop(self.container_name, None)
 
     def activate(self):
-        if not self.config_start_on_creation:
-            self._activate()
+        if self.config_start_on_creation:
+            return
+
+        with ACTIVATION_LOCK:
+            if self.container_name not in STARTED_CONTAINERS:
+                if self.config_keep_alive:
+                    self.keep_alive.acquire(self._activate, lambda: self.container_status() == 'running')
+                else:
+                    self._activate()
+
+                STARTED_CONTAINERS[self.container_name] = self
+
+            ACTIVATIONS[self.container_name] = ACTIVATIONS.get(self.container_name, 0) + 1
 
     def deactivate(self):
-        if not self.config_start_on_creation:
+        if self.config_start_on_creation:
+            return
+
+        with ACTIVATION_LOCK:
+            remaining = ACTIVATIONS.get(self.container_name, 1) - 1
+            if remaining > 0:
+                ACTIVATIONS[self.container_name] = remaining
+                return
+
+            ACTIVATIONS.pop(self.container_name, None)
+
+        # Keep the container running until the current Hatch command finishes, if there is one
+        context = click.get_current_context(silent=True)
+        if context is None:
+            release_container(self.container_name)
+        else:
+            context.find_root().call_on_close(lambda: release_container(self.container_name))
+
+    def release(self):
+        if self.config_keep_alive:
+            # Leave the container running for subsequent commands until it becomes idle
+            self.keep_alive.release()
+        else:
             self._deactivate()
 
     def find(self):
         return self.container_name
 
     def create(self):
-        build_dir = self.data_directory / 'dockerfiles' / self.base_image_id
-        dockerfile = build_dir / 'Dockerfile'
+        if self.config_build_workers > 1:
+            environments = [self]
+            environments.extend(
+                environment
+                for environment in self.get_matrix_environments()
+                if environment.name != self.name and not environment.exists()
+            )
+            build_images(environments, self.config_build_workers)
+
+        self.build_image()
+
+        # Anything recorded about a previous container with the same name no longer applies, except for
+        # the snapshot which is kept until it is replaced and the virtual environment volume that was kept
+        state = self.load_state()
+        snapshot = state.get('snapshot')
+        kept_venv_volume = state.get('venv_volume')
+        self.state_file.remove()
+        if snapshot:
+            self.save_state(snapshot=snapshot)
+
+        image = self.image
+        # Snapshots cannot capture the contents of volumes
+        restored = (
+            self.config_snapshot and not self.config_venv_volume and bool(self.docker.image_id(self.snapshot_image))
+        )
+        baked_dependencies = self.use_dependencies_image
+        if self.config_bake_dependencies and self.dependencies and not baked_dependencies:
+            self.app.display_warning(
+                f'Not baking the dependencies of environment `{self.name}` into an image, '
+                f'image builds cannot see its environment variables'
+            )
+        if restored:
+            image = self.snapshot_image
+        elif baked_dependencies:
+            self.build_dependencies_image()
+            image = self.dependencies_image
+
+        command = self.config_command
+        volumes = [f'{self.root}:{self.project_path}', *self.installer_cache_volumes]
+        if self.config_venv_volume:
+            # A new volume is populated with the image's virtual environment when first mounted
+            volumes.append(f'{self.venv_volume}:{self.venv_path}')
+            self.save_state(venv_volume=self.venv_volume)
+        if self.config_exec_agent:
+            self.agent_directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            (self.agent_directory / 'agent.py').write_text(Path(agent.__file__).read_text())
+            self.agent_unavailable_file.remove()
+            self.__agent_available = None
+
+            command = ['python', f'{self.agent_path}/agent.py', f'{self.agent_path}/agent.sock']
+            volumes.append(f'{self.agent_directory}:{self.agent_path}')
+
+        # Environments that were removed earlier in the same Hatch command must be gone before being recreated
+        remove_pending(self.docker)
+
+        # Containers created by previous versions have no label so they are not found by the status lookup,
+        # only look for one the first time that the environment is created
+        if self.container_name in self.get_container_states() or not self.unlabeled_checked_file.is_file():
+            self.docker.remove(self.container_name, force=True)
+            self.unlabeled_checked_file.parent.ensure_dir_exists()
+            self.unlabeled_checked_file.touch()
+
+        # A kept volume is superseded once the dependencies change or it is no longer used
+        if kept_venv_volume and not (self.config_venv_volume and kept_venv_volume == self.venv_volume):
+            self.docker.remove_volumes([kept_venv_volume])
+
+        env = self.get_container_env_vars()
+        self.docker.create(
+            self.container_name,
+            image,
+            command,
+            workdir=self.project_path,
+            volumes=volumes,
+            env={**self.installer_cache_env_vars, **env},
+            env_directory=str(self.env_directory),
+            labels={CONTAINER_LABEL: 'environment'},
+        )
+        self.set_container_status('created')
+        # The values may be secrets so only fingerprints keyed for this container are recorded
+        env_key = os.urandom(32)
+        self.env_directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with open(os.open(self.env_key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(env_key)
+        self.save_state(env={env_var: fingerprint(value, key=env_key) for env_var, value in env.items()})
+        self.__exec_env_vars = None
+
+        if restored or baked_dependencies:
+            self.save_state(dependencies=self.dependencies_hash)
+
+        if self.config_start_on_creation:
+            self._activate()
+
+        self.image_usage.touch(*{self.image, image})
+        if self.config_image_budget:
+            # The image of the new container is now in use so it is never collected
+            self.collect_images(self.config_image_budget)
+
+    def collect_images(self, budget: int) -> list[str]:
+        """
+        Remove the least recently used images created by the plugin until they fit within `budget` bytes.
+        """
+        removed = collect_images(self.docker, self.image_usage, budget)
+        BUILT_IMAGES.difference_update(removed)
+        return removed
+
+    def build_image(self):
+        if self.image in BUILT_IMAGES:
+            return
+
+        self.resolve_image(self.base_image)
+        self.build_cached_image(
+            self.image,
+            construct_dockerfile(self.base_image, cache_mounts=self.use_buildkit),
+            self.base_image,
+            self.data_directory / 'dockerfiles' / self.base_image_id,
+        )
+
+    def build_dependencies_image(self):
+        self.build_cached_image(
+            self.dependencies_image,
+            construct_dependencies_dockerfile(self.image, sorted(self.dependencies), cache_mounts=self.use_buildkit),
+            self.image,
+            self.data_directory / 'dockerfiles' / f'{self.base_image_id}_deps_{self.dependencies_hash[:16]}',
+        )
+
+    def build_cached_image(self, image, contents, base_image, build_dir):
+        if image in BUILT_IMAGES:
+            return
+
         build_dir.ensure_dir_exists()
-        dockerfile.write_text(construct_dockerfile(self.base_image))
 
-        command = ['docker', 'build', '--pull', '--tag', self.image, '--file', dockerfile, build_dir]
-        if self.verbosity > 0:  # no cov
-            self.platform.check_command(command)
-        else:
-            self.platform.check_command_output(command)
-
-        # fmt: off
-        command = [
-            'docker', 'create',
-            '--name', self.container_name,
-            '--workdir', self.project_path,
-            '--volume', f'{self.root}:{self.project_path}',
-        ]
-        # fmt: on
+        # Only one process builds a given image at a time, the others wait and then reuse the result
+        with file_lock(build_dir / 'build.lock'):
+            if image in BUILT_IMAGES:
+                return
+
+            dockerfile = build_dir / 'Dockerfile'
+            fingerprint_file = build_dir / 'fingerprint.json'
+
+            # Skip the build entirely if neither the template nor the locally available base image changed
+            # since the last time the image was built, to avoid needlessly contacting the registry
+            base_image_id = self.docker.image_id(base_image)
+            build_info = load_json(fingerprint_file)
+            if (
+                base_image_id
+                and build_info.get('fingerprint') == fingerprint(contents, base_image_id)
+                and build_info.get('image') == self.docker.image_id(image)
+            ):
+                BUILT_IMAGES.add(image)
+                return
+
+            dockerfile.write_text(contents)
+            # Base images are resolved according to the pull policy beforehand
+            self.docker.build(image, dockerfile, build_dir, pull=False, buildkit=self.use_buildkit)
+
+            build_info = {
+                'fingerprint': fingerprint(contents, self.docker.image_id(base_image)),
+                'image': self.docker.image_id(image),
+            }
+            save_json(fingerprint_file, build_info)
+            BUILT_IMAGES.add(image)
+            self.image_usage.touch(image)
+
+    def resolve_image(self, image: str):
+        """
+        Make sure that an up-to-date copy of `image` is available locally, as dictated by the `image-pull` option.
+        """
+        if image in RESOLVED_IMAGES:
+            return
+
+        self.pull_directory.ensure_dir_exists()
+        image_id = re.sub(r'[^\w.-]', '_', image)
+        with file_lock(self.pull_directory / f'{image_id}.lock'):
+            pull_file = self.pull_directory / f'{image_id}.json'
+            local_id = self.docker.image_id(image)
+
+            policy = self.config_image_pull
+            if policy == 'daily':
+                pull_info = load_json(pull_file)
+                if local_id and pull_info.get('digest') == local_id and time.time() - pull_info['resolved'] < 86400:
+                    policy = 'never'
+            elif policy == 'missing' and local_id:
+                policy = 'never'
+
+            if policy == 'never':
+                if not local_id:
+                    self.app.abort(f'Image `{image}` is not available locally and the `image-pull` option is `never`')
+            else:
+                process = self.docker.pull(image)
+                if process.returncode:
+                    # Continue working offline with whatever is available
+                    if not local_id:
+                        self.app.abort(process.stderr.decode('utf-8'), code=process.returncode)
 
-        self.apply_env_vars(command)
-        command.append(self.image)
-        command.extend(self.config_command)
+                    self.app.display_warning(f'Unable to pull image `{image}`, using the local copy')
+                else:
+                    save_json(pull_file, {'resolved': time.time(), 'digest': self.docker.image_id(image)})
 
-        self.platform.check_command_output(command)
+        RESOLVED_IMAGES.add(image)
 
-        if self.config_start_on_creation:
-            self._activate()
+    def get_matrix_environments(self) -> list[ContainerEnvironment]:
+        """
+        Return every container environment of the matrix that this environment belongs to, including itself.
+        """
+        from hatch.project.core import Project
 
-    def remove(self):
-        if self.config_start_on_creation:
-            self._deactivate()
+        project = Project(self.root)
+        project.config.finalize_env_overrides(self.get_option_types())
+        for matrix in project.config.matrices.values():
+            if self.name in matrix['envs']:
+                break
+        else:
+            return [self]
+
+        return [
+            type(self)(
+                self.root,
+                self.metadata,
+                name,
+                project.config.envs[name],
+                project.config.matrix_variables.get(name, {}),
+                self.data_directory,
+                self.platform,
+                self.verbosity,
+                self.app,
+            )
+            for name in matrix['envs']
+            if project.config.envs[name].get('type') == self.PLUGIN_NAME
+        ]
 
-        self.platform.check_command_output(['docker', 'rm', self.container_name])
+    def remove(self):
+        # Forcibly removing containers also stops them, even if they are paused
+        with ACTIVATION_LOCK:
+            ACTIVATIONS.pop(self.container_name, None)
+            STARTED_CONTAINERS.pop(self.container_name, None)
+
+        self.keep_alive_directory.remove()
+
+        containers = [self.container_name]
+        # Builders are only left behind if a build was interrupted
+        if self.builder_container_name in self.get_container_states():
+            containers.append(self.builder_container_name)
+
+        volumes = []
+        venv_volume = self.load_state().get('venv_volume')
+        if venv_volume and not self.config_keep_venv_volume:
+            volumes.append(venv_volume)
+
+        with PENDING_REMOVALS_LOCK:
+            PENDING_REMOVALS[self.container_name] = (containers, volumes)
+            first_removal = len(PENDING_REMOVALS) == 1
+
+        self.set_container_status('')
+
+        # Remove every environment of the current Hatch command at once, if there is one
+        context = click.get_current_context(silent=True)
+        if context is None:
+            remove_pending(self.docker)
+        elif first_removal:
+            docker = self.docker
+            context.find_root().call_on_close(lambda: remove_pending(docker))
+
+        self.agent_directory.remove()
+        self.env_directory.remove()
+        self.state_file.remove()
+        self.builder_staging_directory.remove()
+
+        # Remember the kept volume so that it can be removed once a new one replaces it
+        if venv_volume and self.config_keep_venv_volume:
+            self.save_state(venv_volume=venv_volume)
 
     def exists(self):
-        output = self.platform.check_command_output(
-            ['docker', 'ps', '-a', '--format', '{{.Names}}', '--filter', f'name={self.container_name}']
-        )
-
-        return any(line.strip() == self.container_name for line in output.splitlines())
+        return self.container_name in self.get_container_states()
 
     def install_project(self):
         with self:
-            self.platform.check_command(self.construct_pip_install_command([self.apply_features(self.project_path)]))
+            self.check_container_command(
+                super().construct_pip_install_command([self.apply_features(self.project_path)])
+            )
 
     def install_project_dev_mode(self):
         with self:
-            self.platform.check_command(
-                self.construct_pip_install_command(['--editable', self.apply_features(self.project_path)])
+            self.check_container_command(
+                super().construct_pip_install_command(['--editable', self.apply_features(self.project_path)])
             )
 
+        # The environment is only complete if the dependencies were already installed
+        if (
+            self.config_snapshot
+            and not self.config_venv_volume
+            and self.load_state().get('dependencies') == self.dependencies_hash
+        ):
+            self.save_snapshot()
+
     def dependencies_in_sync(self):
         if not self.dependencies:
             return True
 
+        # Avoid starting the container if this exact set of dependencies was already installed
+        dependencies_hash = self.dependencies_hash
+        if self.load_state().get('dependencies') == dependencies_hash:
+            return True
+
         with self:
-            process = self.platform.run_command(
-                self.construct_container_command(['hatchling', 'dep', 'synced', '-p', 'python', *self.dependencies]),
-                capture_output=True,
+            process = self.run_container_command(
+                ['hatchling', 'dep', 'synced', '-p', 'python', *self.dependencies], capture_output=True
             )
-            return not process.returncode
+
+        if process.returncode:
+            return False
+
+        self.save_state(dependencies=dependencies_hash)
+        return True
 
     def sync_dependencies(self):
         with self:
-            self.platform.check_command(self.construct_pip_install_command(self.dependencies))
+            self.check_container_command(super().construct_pip_install_command(self.dependencies))
+
+        self.save_state(dependencies=self.dependencies_hash)
+        if self.config_snapshot and not self.config_venv_volume:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        image = self.snapshot_image
+        if self.docker.image_id(image):
+            return
+
+        self.docker.commit(self.container_name, image)
+        self.image_usage.touch(image)
+
+        # Only the most recent snapshot of each environment is kept
+        previous_image = self.load_state().get('snapshot')
+        if previous_image and previous_image != image:
+            self.docker.remove_image(previous_image)
+
+        self.save_state(snapshot=image)
+
+    def load_state(self) -> dict:
+        return load_json(self.state_file)
+
+    def save_state(self, **updates):
+        state = self.load_state()
+        state.update(updates)
+
+        self.state_file.parent.ensure_dir_exists()
+        save_json(self.state_file, state)
 
     @contextmanager
     def command_context(self):
@@ -196,67 +1025,220 @@ class ContainerEnvironment(EnvironmentInterface):
             yield
 
     def run_shell_command(self, command):
-        return self.platform.run_command(self.construct_container_shell_command(command))
+        return self.run_container_command(['sh', '-c', command])
 
     def enter_shell(self, name, path, args):  # no cov
         with self:
-            process = self.platform.run_command(self.construct_container_command([self.config_shell], interactive=True))
+            with self.trace('exec', self.container_name):
+                process = self.platform.run_command(
+                    self.construct_container_command([self.config_shell], interactive=True)
+                )
+
             self.platform.exit_with_code(process.returncode)
 
     @contextmanager
     def build_environment(self, dependencies: list[str]):
-        with temp_directory() as temp_dir:
-            dockerfile = temp_dir / 'Dockerfile'
-            dockerfile.write_text(construct_dockerfile(self.base_image, builder=True))
-
-            command = ['docker', 'build', '--pull', '--tag', self.builder_image, '--file', dockerfile, str(self.root)]
-            if self.verbosity > 0:  # no cov
-                self.platform.check_command(command)
-            else:
-                self.platform.check_command_output(command)
-
-            local_artifact_dir = temp_dir / 'artifacts'
-            container_artifact_dir = f'{self.project_path}/dist'
-
-            # fmt: off
-            command = [
-                'docker', 'create',
-                '--name', self.builder_container_name,
-                '--workdir', self.project_path,
-            ]
-            # fmt: on
-
-            self.apply_env_vars(command)
-            command.append(self.builder_image)
-            command.extend(self.config_command)
-
-            self.platform.check_command_output(command)
-            try:
-                self.platform.check_command_output(['docker', 'start', self.builder_container_name])
-                self.platform.check_command(self.construct_builder_pip_install_command(dependencies))
-
+        builder = None
+        if self.config_builder_pool:
+            pool = self.get_builder_pool(dependencies)
+            slot = pool.acquire()
+            if slot is not None:
+                builder = self.pooled_builder(pool, slot, dependencies)
+
+        # Also when every pooled builder is busy
+        if builder is None:
+            builder = self.temporary_builder(dependencies)
+
+        try:
+            with builder as staging_dir, ExitStack() as build_trace:
+                # Hatch waits for the build process to exit before leaving this context
+                self.__build_trace = build_trace
                 data = {'output_dir': ''}
                 yield data
+                build_trace.close()
 
                 output_dir = Path(data['output_dir'])
                 output_dir.ensure_dir_exists()
 
-                self.platform.check_command_output(
-                    ['docker', 'cp', f'{self.builder_container_name}:{container_artifact_dir}', local_artifact_dir]
+                # Files written through the bind mount are owned by the container's user, which rootless daemons
+                # map to the current user and others do not
+                if sys.platform != 'win32' and not owned_by_current_user(staging_dir):
+                    with self.trace('exec', self.__builder_container_name):
+                        self.platform.check_command_output(
+                            self.construct_builder_command(
+                                ['chown', '-R', f'{os.getuid()}:{os.getgid()}', self.builder_artifact_path]
+                            )
+                        )
+
+                for artifact in staging_dir.iterdir():
+                    move_file(artifact, output_dir / artifact.name)
+        finally:
+            self.__builder_container_name = ''
+            self.__build_trace = None
+
+    @contextmanager
+    def temporary_builder(self, dependencies: list[str]):
+        # The builder image and container are shared by every build of the project
+        self.builder_lock_file.parent.ensure_dir_exists()
+        with file_lock(self.builder_lock_file), temp_directory() as temp_dir:
+            staging_dir = self.builder_staging_directory
+            prepare_staging_directory(staging_dir)
+
+            self.resolve_image(self.base_image)
+
+            # Image builds do not see the environment variables, which may configure package indexes and
+            # their credentials, so only bake the build dependencies into the image when there are none
+            baked_dependencies = [] if self.has_custom_env_vars() else dependencies
+
+            if self.config_build_context == 'sdist':
+                # Send only what would be in the source distribution, under a directory so that it
+                # can never conflict with the Dockerfile
+                dockerfile = construct_dockerfile(
+                    self.base_image,
+                    builder=True,
+                    source='project',
+                    dependencies=baked_dependencies,
+                    cache_mounts=self.use_buildkit,
+                )
+                archive = iter_archive(
+                    ((path, f'project/{name}') for path, name in get_sdist_files(self.root)),
+                    {'Dockerfile': dockerfile.encode('utf-8')},
+                )
+                self.docker.build_archive(self.builder_image, archive, pull=False, buildkit=self.use_buildkit)
+            else:
+                dockerfile = temp_dir / 'Dockerfile'
+                dockerfile.write_text(
+                    construct_dockerfile(
+                        self.base_image,
+                        builder=True,
+                        dependencies=baked_dependencies,
+                        cache_mounts=self.use_buildkit,
+                    )
                 )
 
-                for artifact in local_artifact_dir.iterdir():
-                    artifact.replace(output_dir / artifact.name)
+                self.docker.build(self.builder_image, dockerfile, self.root, pull=False, buildkit=self.use_buildkit)
+
+            self.image_usage.touch(self.builder_image)
+            self.docker.create(
+                self.builder_container_name,
+                self.builder_image,
+                self.config_command,
+                workdir=self.project_path,
+                volumes=[*self.installer_cache_volumes, f'{staging_dir}:{self.builder_artifact_path}'],
+                env={**self.installer_cache_env_vars, **self.get_container_env_vars()},
+                env_directory=str(self.env_directory),
+                labels={CONTAINER_LABEL: 'builder'},
+            )
+            self.__builder_container_name = self.builder_container_name
+            try:
+                self.docker.start(self.builder_container_name)
+                if dependencies and not baked_dependencies:
+                    self.platform.check_command(self.construct_builder_pip_install_command(dependencies))
+
+                yield staging_dir
             finally:
-                self.platform.run_command(
-                    ['docker', 'stop', '--time', '0', self.builder_container_name], capture_output=True
+                with self.trace('stop', self.builder_container_name):
+                    self.platform.run_command(
+                        ['docker', 'stop', '--time', '0', self.builder_container_name], capture_output=True
+                    )
+                with self.trace('remove', self.builder_container_name):
+                    self.platform.run_command(['docker', 'rm', self.builder_container_name], capture_output=True)
+
+    @contextmanager
+    def pooled_builder(self, pool: BuilderPool, slot: int, dependencies: list[str]):
+        container_name = pool.container_name(slot)
+        staging_dir = Path(pool.slot_directory(slot)) / 'artifacts'
+        keep_alive = pool.keep_alive(slot)
+        self.__builder_container_name = container_name
+        try:
+            try:
+                keep_alive.acquire(
+                    lambda: self.start_pooled_builder(container_name, staging_dir, dependencies),
+                    lambda: self.docker.status(container_name) == 'running',
                 )
-                self.platform.run_command(['docker', 'rm', self.builder_container_name], capture_output=True)
+
+                # Replace the source of the previous build, the artifact directory is a mount point
+                prepare_staging_directory(staging_dir)
+                # fmt: off
+                command = [
+                    'find', self.project_path, '-mindepth', '1', '-maxdepth', '1',
+                    '!', '-path', self.builder_artifact_path,
+                    '-exec', 'rm', '-rf', '{}', '+',
+                ]
+                # fmt: on
+                with self.trace('exec', container_name):
+                    self.platform.check_command_output(self.construct_builder_command(command))
+                if self.config_build_context == 'sdist':
+                    self.docker.put_archive(container_name, self.project_path, iter_archive(get_sdist_files(self.root)))
+                else:
+                    with self.trace('cp', container_name):
+                        self.platform.check_command_output(
+                            ['docker', 'cp', f'{self.root}{os.sep}.', f'{container_name}:{self.project_path}']
+                        )
+
+                yield staging_dir
+            finally:
+                keep_alive.release()
+        finally:
+            pool.release(slot)
+
+    def start_pooled_builder(self, container_name: str, staging_dir: Path, dependencies: list[str]):
+        if self.docker.exists(container_name):
+            self.docker.start(container_name)
+            return
+
+        # Pooled builders are shared by all projects so only the installer cache is configured at creation
+        prepare_staging_directory(staging_dir)
+        self.docker.create(
+            container_name,
+            self.image,
+            self.config_command,
+            workdir=self.project_path,
+            volumes=[*self.installer_cache_volumes, f'{staging_dir}:{self.builder_artifact_path}'],
+            env=self.installer_cache_env_vars,
+            labels={CONTAINER_LABEL: 'builder'},
+        )
+        try:
+            self.docker.start(container_name)
+            with self.trace('exec', container_name):
+                self.platform.check_command(self.construct_builder_pip_install_command(dependencies))
+        except BaseException:
+            # Never leave behind a builder that is missing build dependencies
+            with self.trace('remove', container_name):
+                self.platform.run_command(['docker', 'rm', '--force', container_name], capture_output=True)
+            raise
+
+    def get_builder_pool(self, dependencies: list[str]) -> BuilderPool:
+        # Pooled builders are based on the environment image without the project so that they can be reused
+        self.build_image()
+        key = fingerprint(self.docker.image_id(self.image), *sorted(dependencies))[:16]
+
+        return BuilderPool(
+            str(self.data_directory / 'builders' / key),
+            f'hatch-builder_{key}',
+            self.config_builder_pool,
+            self.config_builder_pool_ttl,
+            trace=self.config_trace,
+            trace_format=self.config_trace_format,
+        )
 
     def get_build_process(self, build_environment, **kwargs):
         build_environment['output_dir'] = kwargs.pop('directory', '') or str(self.root / 'dist')
 
-        return self.platform.capture_process(self.construct_builder_command(self.construct_build_command(**kwargs)))
+        command = self.construct_builder_command(self.construct_build_command(**kwargs))
+        if self.__build_trace is None:
+            return self.platform.capture_process(command)
+
+        # The span lasts until the build environment is left, after the process has exited
+        fields = self.__build_trace.enter_context(self.trace('exec', self.__builder_container_name))
+        fields['build'] = True
+        process = self.platform.capture_process(command)
+
+        def record_exit_code():
+            fields['exit_code'] = process.poll()
+
+        self.__build_trace.callback(record_exit_code)
+        return process
 
     def construct_pip_install_command(self, *args, **kwargs):
         return self.construct_container_command(super().construct_pip_install_command(*args, **kwargs))
@@ -265,17 +1247,93 @@ class ContainerEnvironment(EnvironmentInterface):
         return self.construct_builder_command(super().construct_pip_install_command(*args, **kwargs))
 
     def get_container_env_vars(self) -> dict:
-        if self.env_include:
-            return dict(EnvVars(self.env_vars, self.env_include))
-        else:
-            return dict(self.env_vars)
+        if self.__container_env_vars is None:
+            if self.env_include:
+                self.__container_env_vars = dict(EnvVars(self.env_vars, self.env_include))
+            else:
+                self.__container_env_vars = dict(self.env_vars)
+
+        return self.__container_env_vars
+
+    def has_custom_env_vars(self) -> bool:
+        # Hatch always tells commands which environment is active
+        return any(env_var != AppEnvVars.ENV_ACTIVE for env_var in self.get_container_env_vars())
+
+    def get_exec_env_vars(self) -> dict:
+        """
+        Return the environment variables that differ from those the container was created with, since
+        commands executed in the container inherit the latter.
+        """
+        if self.__exec_env_vars is None:
+            try:
+                env_key = self.env_key_file.read_bytes()
+            except OSError:
+                env_key = b''
+
+            # Without the key nothing is known about how the container was created
+            created_env_vars = self.load_state().get('env', {}) if env_key else {}
+            self.__exec_env_vars = {
+                env_var: value
+                for env_var, value in self.get_container_env_vars().items()
+                if created_env_vars.get(env_var) != fingerprint(value, key=env_key)
+            }
+
+        return self.__exec_env_vars
+
+    def run_container_command(self, args, *, capture_output=False):
+        env = self.get_exec_env_vars()
+        if self.config_exec_agent and self.agent_available():
+            socket_path = str(self.agent_directory / 'agent.sock')
+            try:
+                with self.trace('exec', self.container_name) as fields:
+                    fields['agent'] = True
+                    process = run_process(
+                        args,
+                        lambda stdout, stderr: agent.run(
+                            socket_path, args, env=env, cwd=self.project_path, stdout=stdout, stderr=stderr
+                        ),
+                        capture_output=capture_output,
+                    )
+                    fields['exit_code'] = process.returncode
+
+                return process
+            # Sockets cannot be shared with the host when the daemon runs in a virtual machine
+            except agent.AgentUnavailableError:
+                self.set_agent_unavailable()
+            # Running the command again could repeat whatever it already did
+            except ConnectionError as e:
+                self.set_agent_unavailable()
+                self.app.abort(f'Lost the connection to the agent of container `{self.container_name}`: {e}')
+
+        return self.docker.exec(
+            self.container_name, args, env=env, env_directory=str(self.env_directory), capture_output=capture_output
+        )
+
+    def agent_available(self) -> bool:
+        # Every process would otherwise wait for the agent before giving up
+        if self.__agent_available is None:
+            self.__agent_available = not self.agent_unavailable_file.is_file()
+
+        return self.__agent_available
+
+    def set_agent_unavailable(self):
+        self.__agent_available = False
+        self.agent_directory.ensure_dir_exists()
+        self.agent_unavailable_file.touch()
+
+    def check_container_command(self, args):
+        process = self.run_container_command(args)
+        if process.returncode:
+            self.platform.exit_with_code(process.returncode)
+
+        return process
 
     def construct_container_command(self, args, *, interactive=False):
         command = ['docker', 'exec']
         if interactive:  # no cov
             command.append('-it')
 
-        self.apply_env_vars(command)
+        self.apply_env_vars(command, self.get_exec_env_vars())
         command.append(self.container_name)
         command.extend(args)
         return command
@@ -283,18 +1341,17 @@ class ContainerEnvironment(EnvironmentInterface):
     def construct_builder_command(self, args):
         command = ['docker', 'exec']
 
-        self.apply_env_vars(command)
-        command.append(self.builder_container_name)
+        # Pooled builders are not created with the environment variables
+        self.apply_env_vars(command, self.get_container_env_vars())
+        command.append(self.__builder_container_name or self.builder_container_name)
         command.extend(args)
         return command
 
-    def apply_env_vars(self, command):
+    def apply_env_vars(self, command, env):
         # This ensures that all commands that are executed have access to the environment variables
-        # that are currently defined at all times. Note that we create the images with the environment
-        # variables defined at that time only for debugging purposes if users for some reason enter
-        # the containers manually rather than using the `hatch shell` command.
-        for env_var, value in self.get_container_env_vars().items():
-            command.extend(('--env', f'{env_var}={value}'))
+        # that are currently defined at all times, in addition to those defined when the container
+        # was created.
+        self.docker.apply_env_vars(command, env, str(self.env_directory))
 
     def construct_container_shell_command(self, command):
         return self.construct_container_command(['sh', '-c', command])
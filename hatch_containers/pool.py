@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import os
+
+from hatch_containers.keepalive import KeepAlive, remove_file
+from hatch_containers.utils import file_lock, pid_exists
+
+
+class BuilderPool:
+    """
+    Leases up to `size` builder containers, which share an image and set of build dependencies, to one
+    process at a time.
+
+    The pool's directory contains `lock`, which is held while choosing a slot, and a directory for every slot
+    with a `pid` file naming the process that is currently using the slot's container. The slot's directory
+    is also used to remove its container once it has been idle for `ttl` seconds, which is recorded in the
+    `trace` file if it is set.
+    """
+
+    def __init__(self, directory: str, name: str, size: int, ttl: int, *, trace='', trace_format='jsonl'):
+        self.directory = directory
+        self.name = name
+        self.size = size
+        self.ttl = ttl
+        self.trace = trace
+        self.trace_format = trace_format
+
+        self.lock_file = os.path.join(directory, 'lock')
+
+    def container_name(self, slot: int) -> str:
+        return f'{self.name}_{slot}'
+
+    def slot_directory(self, slot: int) -> str:
+        return os.path.join(self.directory, str(slot))
+
+    def keep_alive(self, slot: int) -> KeepAlive:
+        return KeepAlive(
+            self.slot_directory(slot),
+            self.container_name(slot),
+            self.ttl,
+            remove=True,
+            trace=self.trace,
+            trace_format=self.trace_format,
+        )
+
+    def acquire(self) -> int | None:
+        """
+        Return the first slot that is not being used by any process, or `None` if all are in use.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with file_lock(self.lock_file):
+            for slot in range(self.size):
+                pid_file = os.path.join(self.slot_directory(slot), 'pid')
+                try:
+                    with open(pid_file, encoding='utf-8') as f:
+                        pid = int(f.read())
+                except (OSError, ValueError):
+                    pid = 0
+
+                # The slot is also free if the process exited without releasing it
+                if pid and pid_exists(pid):
+                    continue
+
+                os.makedirs(self.slot_directory(slot), exist_ok=True)
+                with open(pid_file, 'w', encoding='utf-8') as f:
+                    f.write(str(os.getpid()))
+
+                return slot
+
+        return None
+
+    def release(self, slot: int):
+        with file_lock(self.lock_file):
+            remove_file(os.path.join(self.slot_directory(slot), 'pid'))
@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Backend methods that talk to Docker and are therefore recorded
+TRACED_OPERATIONS = frozenset(
+    (
+        'buildkit_available',
+        'build',
+        'build_archive',
+        'put_archive',
+        'pull',
+        'create',
+        'start',
+        'stop',
+        'pause',
+        'unpause',
+        'remove',
+        'remove_image',
+        'inspect_images',
+        'container_images',
+        'remove_images',
+        'prune_images',
+        'remove_containers',
+        'remove_volumes',
+        'commit',
+        'status',
+        'image_id',
+        'exists',
+        'list_containers',
+        'exec',
+    )
+)
+
+# Tracers are shared by every environment of the process that writes to the same file
+TRACERS: dict[tuple[str, str], Tracer] = {}
+TRACERS_LOCK = threading.Lock()
+
+
+class Tracer:
+    """
+    Appends a timing span for every traced operation to `path`, either as JSON lines or as events of the
+    Chrome trace format, which may be loaded into `chrome://tracing` or https://ui.perfetto.dev.
+
+    Chrome traces are written without the closing bracket of the array, which the format allows, so that
+    any number of processes may keep appending to the same file.
+    """
+
+    def __init__(self, path: str, trace_format: str):
+        self.path = path
+        self.trace_format = trace_format
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, operation: str, **fields) -> Iterator[dict]:
+        """
+        Record the duration of the body as `operation`. The yielded dictionary holds the fields of the
+        span and may be updated with more details.
+        """
+        fields = {'operation': operation, **fields}
+        start = time.time()
+        counter = time.perf_counter()
+        try:
+            yield fields
+        except BaseException:
+            fields['error'] = True
+            raise
+        finally:
+            self.write(fields, start, time.perf_counter() - counter)
+
+    def write(self, fields: dict, start: float, duration: float):
+        if self.trace_format == 'chrome':
+            event = {
+                'name': fields['operation'],
+                'cat': 'docker',
+                'ph': 'X',
+                'ts': round(start * 1_000_000),
+                'dur': round(duration * 1_000_000),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {key: value for key, value in fields.items() if key != 'operation'},
+            }
+            entry = f'{json.dumps(event)},\n'
+        else:
+            record = {**fields, 'start': start, 'duration': duration, 'pid': os.getpid()}
+            entry = f'{json.dumps(record)}\n'
+
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if self.trace_format == 'chrome' and not f.tell():
+                    entry = f'[\n{entry}'
+
+                f.write(entry)
+
+
+def get_tracer(path: str, trace_format: str) -> Tracer:
+    with TRACERS_LOCK:
+        key = (path, trace_format)
+        if key not in TRACERS:
+            TRACERS[key] = Tracer(path, trace_format)
+
+        return TRACERS[key]
+
+
+class TracedBackend:
+    """
+    Wraps a backend so that every operation that talks to Docker is recorded by `tracer`, along with the
+    name of the environment and its image. Everything else is passed through untouched.
+    """
+
+    def __init__(self, backend, tracer: Tracer, *, environment: str, image: str):
+        self.backend = backend
+        self.tracer = tracer
+        self.environment = environment
+        self.image = image
+
+    def span(self, operation: str, target: str = ''):
+        fields = {'environment': self.environment, 'image': self.image}
+        if target:
+            fields['target'] = target
+
+        return self.tracer.span(operation, **fields)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.backend, name)
+        if name not in TRACED_OPERATIONS:
+            return attribute
+
+        def traced(*args, **kwargs):
+            # The first argument is always the container or image being operated on
+            target = args[0] if args and isinstance(args[0], str) else ''
+            with self.span(name, target) as fields:
+                result = attribute(*args, **kwargs)
+                if isinstance(result, subprocess.CompletedProcess):
+                    fields['exit_code'] = result.returncode
+
+                return result
+
+        return traced
@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+
+def fingerprint(*parts: str, key: bytes | None = None) -> str:
+    # Keyed fingerprints cannot be used to guess the parts by anyone who does not have the key
+    hasher = hashlib.sha256() if key is None else hmac.new(key, digestmod=hashlib.sha256)
+    for part in parts:
+        hasher.update(part.encode('utf-8'))
+        # Separate the parts so that moving characters between adjacent parts changes the result
+        hasher.update(b'\0')
+
+    return hasher.hexdigest()
+
+
+def load_json(path) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json(path, data: dict):
+    # Write to a temporary file first so that concurrent readers never see partial contents
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on `path`, blocking until any other process releases it.
+    """
+    with open(path, 'a+b') as f:
+        if sys.platform == 'win32':
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    # This only blocks for up to 10 seconds
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def pid_exists(pid: int) -> bool:
+    if sys.platform == 'win32':
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
@@ -14,7 +14,10 @@ from hatch.utils.fs import Path, temp_directory
 from hatch.utils.platform import Platform
 from hatch.utils.structures import EnvVars
 
-from .utils import update_project_environment
+from hatch_containers import plugin
+from hatch_containers.plugin import ContainerEnvironment
+
+from .utils import FakeDocker, update_project_environment
 
 PLATFORM = Platform()
 
@@ -138,3 +141,25 @@ def container_project(hatch, temp_dir_data, config_file, project_name, default_i
     update_project_environment(project, 'default', config)
 
     yield project_path
+
+
+@pytest.fixture(autouse=True)
+def container_states():
+    yield
+
+    # The states are only cached for the duration of a process
+    plugin.CONTAINER_STATES.clear()
+    plugin.CONTAINER_STATES_QUERIED.clear()
+    plugin.ACTIVATIONS.clear()
+    plugin.STARTED_CONTAINERS.clear()
+
+
+@pytest.fixture
+def docker(monkeypatch):
+    docker = FakeDocker()
+    monkeypatch.setattr(ContainerEnvironment, 'docker', property(lambda _: docker))
+
+    # Nothing about images may be remembered from other tests
+    monkeypatch.setattr(plugin, 'BUILT_IMAGES', set())
+    monkeypatch.setattr(plugin, 'RESOLVED_IMAGES', set())
+    return docker
@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import click
+import pytest
+from hatch.project.core import Project
+
+from hatch_containers.plugin import ContainerEnvironment
+
+from .utils import create_environment
+
+
+class RecordingEnvironment(ContainerEnvironment):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def _activate(self):
+        self.calls.append('start')
+
+    def _deactivate(self):
+        self.calls.append('stop')
+
+
+@pytest.fixture
+def environment(isolation, temp_dir, platform):
+    project = Project(
+        isolation,
+        config={
+            'project': {'name': 'my_app', 'version': '0.0.1'},
+            'tool': {'hatch': {'envs': {'default': {}}}},
+        },
+    )
+    return RecordingEnvironment(
+        isolation, project.metadata, 'default', project.config.envs['default'], {}, temp_dir, platform, 0
+    )
+
+
+def test_nested(environment):
+    with environment:
+        with environment:
+            assert environment.calls == ['start']
+
+    assert environment.calls == ['start', 'stop']
+
+
+def test_sequential_without_command(environment):
+    with environment:
+        pass
+
+    with environment:
+        pass
+
+    assert environment.calls == ['start', 'stop', 'start', 'stop']
+
+
+def test_sequential_within_command(environment):
+    with click.Context(click.Command('hatch')):
+        with environment:
+            pass
+
+        with environment:
+            pass
+
+        assert environment.calls == ['start']
+
+    assert environment.calls == ['start', 'stop']
+
+
+def test_removal_of_started(environment, docker):
+    docker.containers['my-app_default'] = 'created'
+
+    with click.Context(click.Command('hatch')):
+        with environment:
+            pass
+
+        environment.remove()
+        assert environment.calls == ['start']
+
+    # The container is forcibly removed rather than stopped
+    assert environment.calls == ['start']
+    assert docker.get_calls('stop', 'remove_containers') == [('remove_containers', ['my-app_default'])]
+
+
+class TestPause:
+    @pytest.fixture
+    def environment(self, isolation, temp_dir, platform):
+        return create_environment(isolation, temp_dir, platform, suspend='pause')
+
+    @pytest.mark.parametrize(
+        ('status', 'calls'),
+        [('created', ['start', 'pause']), ('exited', ['start', 'pause']), ('paused', ['unpause', 'pause'])],
+    )
+    def test_lifecycle(self, environment, docker, status, calls):
+        docker.containers['my-app_default'] = status
+
+        with environment:
+            pass
+
+        assert docker.get_calls('start', 'stop', 'pause', 'unpause') == [(call, 'my-app_default') for call in calls]
+        assert docker.containers['my-app_default'] == 'paused'
+
+    def test_remove_paused(self, environment, docker):
+        docker.containers['my-app_default'] = 'paused'
+
+        environment.remove()
+
+        assert docker.get_calls('start', 'stop', 'unpause', 'remove_containers') == [
+            ('remove_containers', ['my-app_default'])
+        ]
@@ -0,0 +1,162 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import socket
+import sys
+import threading
+
+import pytest
+
+from hatch_containers import agent
+
+from .utils import FakeApplication, create_environment
+
+
+@pytest.fixture
+def agent_socket(tmp_path):
+    socket_path = str(tmp_path / 'agent.sock')
+    server = agent.create_server(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield socket_path
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_output(agent_socket):
+    stdout = []
+    stderr = []
+    code = "import sys;print('foo');sys.stdout.flush();print('bar', file=sys.stderr);sys.exit(3)"
+
+    exit_code = agent.run(agent_socket, [sys.executable, '-c', code], stdout=stdout.append, stderr=stderr.append)
+
+    assert exit_code == 3
+    assert b''.join(stdout).splitlines() == [b'foo']
+    assert b''.join(stderr).splitlines() == [b'bar']
+
+
+def test_env_and_cwd(agent_socket, tmp_path):
+    stdout = []
+    code = "import os;print(os.environ['FOO'] + '|' + os.getcwd())"
+
+    exit_code = agent.run(
+        agent_socket, [sys.executable, '-c', code], env={'FOO': 'BAR'}, cwd=str(tmp_path), stdout=stdout.append
+    )
+
+    assert exit_code == 0
+    assert b''.join(stdout).decode('utf-8').strip() == f'BAR|{tmp_path}'
+
+
+def test_missing_executable(agent_socket):
+    stderr = []
+
+    exit_code = agent.run(agent_socket, ['hatch-containers-missing-executable'], stderr=stderr.append)
+
+    assert exit_code == 127
+    assert stderr
+
+
+def test_unavailable(tmp_path):
+    with pytest.raises(agent.AgentUnavailableError):
+        agent.run(str(tmp_path / 'agent.sock'), ['echo'], timeout=0.05)
+
+
+@pytest.fixture
+def broken_agent(tmp_path):
+    """
+    An agent that sends the given frames in response to the first command and then closes the connection.
+    """
+    socket_path = str(tmp_path / 'agent.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    frames = []
+
+    def respond():
+        connection, _ = server.accept()
+        with connection:
+            connection.makefile('rb').readline()
+            for frame_type, payload in frames:
+                connection.sendall(agent.pack_frame(frame_type, payload))
+
+    thread = threading.Thread(target=respond, daemon=True)
+    thread.start()
+
+    try:
+        yield socket_path, frames
+    finally:
+        thread.join(timeout=5)
+        server.close()
+
+
+def test_closed_before_responding(broken_agent):
+    socket_path, _ = broken_agent
+
+    with pytest.raises(agent.AgentUnavailableError):
+        agent.run(socket_path, ['echo'])
+
+
+def test_closed_while_running(broken_agent):
+    socket_path, frames = broken_agent
+    frames.append((agent.STDOUT, b'foo'))
+    stdout = []
+
+    with pytest.raises(ConnectionError) as e:
+        agent.run(socket_path, ['echo'], stdout=stdout.append)
+
+    assert not isinstance(e.value, agent.AgentUnavailableError)
+    assert stdout == [b'foo']
+
+
+class TestEnvironment:
+    def test_fallback_remembered(self, isolation, temp_dir, platform, docker, monkeypatch):
+        attempts = []
+
+        def run(*args, **kwargs):
+            attempts.append(args)
+            raise agent.AgentUnavailableError
+
+        monkeypatch.setattr(agent, 'run', run)
+        environment = create_environment(isolation, temp_dir, platform, **{'exec-agent': True})
+        environment.create()
+
+        assert environment.run_container_command(['python']).returncode == 0
+        assert environment.run_container_command(['python']).returncode == 0
+        # Other processes do not try again either
+        create_environment(isolation, temp_dir, platform, **{'exec-agent': True}).run_container_command(['python'])
+
+        assert len(attempts) == 1
+        assert docker.get_calls('exec') == [('exec', 'my-app_default', ['python'])] * 3
+
+    def test_retried_after_creation(self, isolation, temp_dir, platform, docker, monkeypatch):
+        attempts = []
+
+        def run(*args, **kwargs):
+            attempts.append(args)
+            raise agent.AgentUnavailableError
+
+        monkeypatch.setattr(agent, 'run', run)
+        environment = create_environment(isolation, temp_dir, platform, **{'exec-agent': True})
+        environment.create()
+        environment.run_container_command(['python'])
+
+        environment.create()
+        environment.run_container_command(['python'])
+
+        assert len(attempts) == 2
+
+    def test_connection_lost(self, isolation, temp_dir, platform, docker, monkeypatch):
+        def run(*args, **kwargs):
+            raise ConnectionError('reset')
+
+        monkeypatch.setattr(agent, 'run', run)
+        environment = create_environment(isolation, temp_dir, platform, app=FakeApplication(), **{'exec-agent': True})
+        environment.create()
+
+        with pytest.raises(SystemExit, match='Lost the connection to the agent of container `my-app_default`: reset'):
+            environment.run_container_command(['python'])
+
+        assert docker.get_calls('exec') == []
@@ -0,0 +1,55 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+
+import pytest
+
+from hatch_containers.plugin import move_file, owned_by_current_user, prepare_staging_directory
+
+
+def test_prepare_staging_directory(temp_dir):
+    staging_dir = temp_dir / 'staging'
+    (staging_dir / 'old').mkdir(parents=True)
+    (staging_dir / 'old' / 'foo.whl').touch()
+    (staging_dir / 'bar.tar.gz').touch()
+    inode = staging_dir.stat().st_ino
+
+    prepare_staging_directory(staging_dir)
+
+    assert not list(staging_dir.iterdir())
+    # The directory itself must survive for existing mounts
+    assert staging_dir.stat().st_ino == inode
+
+
+def test_prepare_missing_staging_directory(temp_dir):
+    staging_dir = temp_dir / 'staging'
+
+    prepare_staging_directory(staging_dir)
+
+    assert staging_dir.is_dir()
+
+
+def test_move_file_replaces(temp_dir):
+    source = temp_dir / 'staging' / 'foo.whl'
+    source.parent.mkdir()
+    source.write_text('new')
+    destination = temp_dir / 'dist' / 'foo.whl'
+    destination.parent.mkdir()
+    destination.write_text('old')
+
+    move_file(source, destination)
+
+    assert not source.exists()
+    assert destination.read_text() == 'new'
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='files have no owners on Windows')
+def test_owned_by_current_user(temp_dir, monkeypatch):
+    (temp_dir / 'foo.whl').touch()
+
+    assert owned_by_current_user(temp_dir)
+
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(str(temp_dir)).st_uid + 1)
+    assert not owned_by_current_user(temp_dir)
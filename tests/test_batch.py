@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from __future__ import annotations
+
+import threading
+
+from hatch.project.core import Project
+
+from hatch_containers.batch import build_images
+from hatch_containers.plugin import ContainerEnvironment
+
+from .utils import dedent
+
+
+class FakeEnvironment:
+    def __init__(self, name, image, dependencies_image=''):
+        self.name = name
+        self.image = image
+        self.dependencies_image = dependencies_image
+        self.use_dependencies_image = bool(dependencies_image)
+
+    def build_image(self):
+        with LOCK:
+            BUILDS.append(self.image)
+
+    def build_dependencies_image(self):
+        with LOCK:
+            BUILDS.append(self.dependencies_image)
+
+
+LOCK = threading.Lock()
+BUILDS: list[str] = []
+
+
+def setup_function():
+    BUILDS.clear()
+
+
+def test_build_images_deduplicated():
+    environments = [
+        FakeEnvironment('py3.10', 'python:3.10'),
+        FakeEnvironment('py3.11', 'python:3.11'),
+        FakeEnvironment('py3.11-foo', 'python:3.11', 'python_3.11:hatch-deps-1'),
+        FakeEnvironment('py3.11-bar', 'python:3.11', 'python_3.11:hatch-deps-1'),
+    ]
+
+    build_images(environments, 4)
+
+    assert sorted(BUILDS[:2]) == ['python:3.10', 'python:3.11']
+    assert BUILDS[2:] == ['python_3.11:hatch-deps-1']
+
+
+def test_matrix_environments(temp_dir, platform):
+    project_file = temp_dir / 'pyproject.toml'
+    project_file.write_text(
+        dedent(
+            """
+            [project]
+            name = "my_app"
+            version = "0.0.1"
+
+            [tool.hatch.envs.default]
+            type = "container"
+
+            [tool.hatch.envs.test]
+            type = "container"
+
+            [[tool.hatch.envs.test.matrix]]
+            python = ["3.10", "3.11"]
+            """
+        )
+    )
+    project = Project(temp_dir)
+    environment = ContainerEnvironment(
+        temp_dir,
+        project.metadata,
+        'test.py3.10',
+        project.config.envs['test.py3.10'],
+        {},
+        temp_dir / 'data',
+        platform,
+        0,
+    )
+
+    matrix_environments = environment.get_matrix_environments()
+
+    assert [environment.name for environment in matrix_environments] == ['test.py3.10', 'test.py3.11']
+    assert [environment.image for environment in matrix_environments] == [
+        'python_3.10:hatch-container',
+        'python_3.11:hatch-container',
+    ]
@@ -0,0 +1,40 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import sys
+
+import pytest
+
+from benchmarks.suite import Benchmark
+
+pytestmark = [pytest.mark.skipif(sys.platform == 'win32', reason='the stub is not a Windows executable')]
+
+
+@pytest.mark.parametrize(
+    'flow, commands',
+    [
+        ('create', {'ps': 1, 'create': 1, 'image inspect': 3}),
+        ('remove', {'ps': 1, 'rm': 1}),
+        ('run', {'ps': 1, 'start': 1, 'exec': 1, 'stop': 1}),
+        ('build', {'image inspect': 1, 'build': 1, 'create': 1, 'start': 1, 'exec': 1, 'stop': 1, 'rm': 1}),
+        ('dependencies_in_sync', {'start': 1, 'exec': 1, 'stop': 1}),
+    ],
+)
+def test_docker_calls(temp_dir, flow, commands):
+    result = Benchmark(temp_dir).run(flow, 1)
+
+    assert result.commands == commands
+    assert len(result.times) == 1
+
+
+def test_options(temp_dir):
+    result = Benchmark(temp_dir, options={'start-on-creation': True}).run('run', 1)
+
+    # The container is already running so only the command is executed
+    assert result.commands == {'ps': 1, 'exec': 1}
+
+
+def test_latency(temp_dir):
+    result = Benchmark(temp_dir, latency={'rm': 0.2}).run('remove', 1)
+
+    assert result.times[0] >= 0.2
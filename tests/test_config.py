@@ -274,3 +274,1105 @@ class TestShell:
         )
 
         assert environment.config_shell == '/bin/bash'
+
+
+class TestBackend:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_backend == 'cli'
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'backend': 'api'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_backend == 'api'
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'backend': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.backend` must be a string'):
+            _ = environment.config_backend
+
+    def test_unknown(self, isolation, data_dir, platform):
+        env_config = {'backend': 'foo'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(ValueError, match='Field `tool.hatch.envs.default.backend` must be one of: cli, api'):
+            _ = environment.config_backend
+
+
+class TestExecAgent:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_exec_agent is False
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'exec-agent': True}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_exec_agent is True
+
+    def test_not_boolean(self, isolation, data_dir, platform):
+        env_config = {'exec-agent': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.exec-agent` must be a boolean'):
+            _ = environment.config_exec_agent
+
+    def test_command(self, isolation, data_dir, platform):
+        env_config = {'exec-agent': True, 'command': ['foo']}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(
+            ValueError,
+            match=(
+                'Field `tool.hatch.envs.default.exec-agent` must not be enabled when field '
+                '`tool.hatch.envs.default.command` is set'
+            ),
+        ):
+            _ = environment.config_exec_agent
+
+
+class TestBakeDependencies:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_bake_dependencies is False
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'bake-dependencies': True}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_bake_dependencies is True
+
+    def test_not_boolean(self, isolation, data_dir, platform):
+        env_config = {'bake-dependencies': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.bake-dependencies` must be a boolean'):
+            _ = environment.config_bake_dependencies
+
+
+class TestInstallerCache:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_installer_cache == 'hatch-containers-cache'
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'installer-cache': 'foo'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_installer_cache == 'foo'
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'installer-cache': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.installer-cache` must be a string'):
+            _ = environment.config_installer_cache
+
+    def test_directory(self, isolation, data_dir, platform):
+        env_config = {'installer-cache': '.cache'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_installer_cache == str((isolation / '.cache').resolve())
+        assert environment.installer_cache_volumes == [f'{(isolation / ".cache").resolve()}:/home/cache']
+
+    def test_disabled(self, isolation, data_dir, platform):
+        env_config = {'installer-cache': ''}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.installer_cache_volumes == []
+        assert environment.installer_cache_env_vars == {}
+
+
+class TestKeepAlive:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_keep_alive == 0
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'keep-alive': 300}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_keep_alive == 300
+
+    def test_not_integer(self, isolation, data_dir, platform):
+        env_config = {'keep-alive': '300'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.keep-alive` must be an integer'):
+            _ = environment.config_keep_alive
+
+    def test_negative(self, isolation, data_dir, platform):
+        env_config = {'keep-alive': -1}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(ValueError, match='Field `tool.hatch.envs.default.keep-alive` must not be negative'):
+            _ = environment.config_keep_alive
+
+
+class TestSuspend:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_suspend == 'stop'
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'suspend': 'pause'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_suspend == 'pause'
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'suspend': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.suspend` must be a string'):
+            _ = environment.config_suspend
+
+    def test_unknown(self, isolation, data_dir, platform):
+        env_config = {'suspend': 'foo'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(ValueError, match='Field `tool.hatch.envs.default.suspend` must be one of: stop, pause'):
+            _ = environment.config_suspend
+
+
+class TestBuildWorkers:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_build_workers == 1
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'build-workers': 4}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_build_workers == 4
+
+    def test_not_integer(self, isolation, data_dir, platform):
+        env_config = {'build-workers': '4'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.build-workers` must be an integer'):
+            _ = environment.config_build_workers
+
+    def test_too_low(self, isolation, data_dir, platform):
+        env_config = {'build-workers': 0}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(ValueError, match='Field `tool.hatch.envs.default.build-workers` must be at least 1'):
+            _ = environment.config_build_workers
+
+
+class TestBuilderPool:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_builder_pool == 0
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'builder-pool': 2}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_builder_pool == 2
+
+    def test_not_integer(self, isolation, data_dir, platform):
+        env_config = {'builder-pool': '2'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.builder-pool` must be an integer'):
+            _ = environment.config_builder_pool
+
+    def test_negative(self, isolation, data_dir, platform):
+        env_config = {'builder-pool': -1}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(ValueError, match='Field `tool.hatch.envs.default.builder-pool` must not be negative'):
+            _ = environment.config_builder_pool
+
+
+class TestBuilderPoolTTL:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_builder_pool_ttl == 600
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'builder-pool-ttl': 60}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_builder_pool_ttl == 60
+
+    def test_not_integer(self, isolation, data_dir, platform):
+        env_config = {'builder-pool-ttl': '60'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.builder-pool-ttl` must be an integer'):
+            _ = environment.config_builder_pool_ttl
+
+    def test_too_low(self, isolation, data_dir, platform):
+        env_config = {'builder-pool-ttl': 0}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(ValueError, match='Field `tool.hatch.envs.default.builder-pool-ttl` must be at least 1'):
+            _ = environment.config_builder_pool_ttl
+
+
+class TestBuildContext:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_build_context == 'sdist'
+
+    @pytest.mark.parametrize('source, build_context', [('regex', 'sdist'), ('vcs', 'project')])
+    def test_default_dynamic_version(self, isolation, data_dir, platform, source, build_context):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'dynamic': ['version']},
+                'tool': {'hatch': {'version': {'source': source}, 'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_build_context == build_context
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'build-context': 'project'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_build_context == 'project'
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'build-context': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.build-context` must be a string'):
+            _ = environment.config_build_context
+
+    def test_unknown(self, isolation, data_dir, platform):
+        env_config = {'build-context': 'foo'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(
+            ValueError, match='Field `tool.hatch.envs.default.build-context` must be one of: sdist, project'
+        ):
+            _ = environment.config_build_context
+
+
+class TestBuildkitCache:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_buildkit_cache is False
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'buildkit-cache': True}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_buildkit_cache is True
+
+    def test_not_boolean(self, isolation, data_dir, platform):
+        env_config = {'buildkit-cache': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.buildkit-cache` must be a boolean'):
+            _ = environment.config_buildkit_cache
+
+
+class TestImagePull:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_image_pull == 'daily'
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'image-pull': 'never'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_image_pull == 'never'
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'image-pull': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.image-pull` must be a string'):
+            _ = environment.config_image_pull
+
+    def test_unknown(self, isolation, data_dir, platform):
+        env_config = {'image-pull': 'foo'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(
+            ValueError, match='Field `tool.hatch.envs.default.image-pull` must be one of: always, daily, missing, never'
+        ):
+            _ = environment.config_image_pull
+
+
+class TestSnapshot:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_snapshot is False
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'snapshot': True}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_snapshot is True
+
+    def test_not_boolean(self, isolation, data_dir, platform):
+        env_config = {'snapshot': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.snapshot` must be a boolean'):
+            _ = environment.config_snapshot
+
+
+class TestVenvVolume:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_venv_volume is False
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'venv-volume': True}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_venv_volume is True
+
+    def test_not_boolean(self, isolation, data_dir, platform):
+        env_config = {'venv-volume': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.venv-volume` must be a boolean'):
+            _ = environment.config_venv_volume
+
+
+class TestKeepVenvVolume:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_keep_venv_volume is False
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'keep-venv-volume': True}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_keep_venv_volume is True
+
+    def test_not_boolean(self, isolation, data_dir, platform):
+        env_config = {'keep-venv-volume': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.keep-venv-volume` must be a boolean'):
+            _ = environment.config_keep_venv_volume
+
+
+class TestTrace:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_trace == ''
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'trace': 'trace.jsonl'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_trace == str((isolation / 'trace.jsonl').resolve())
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'trace': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.trace` must be a string'):
+            _ = environment.config_trace
+
+
+class TestTraceFormat:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_trace_format == 'jsonl'
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'trace-format': 'chrome'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_trace_format == 'chrome'
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'trace-format': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.trace-format` must be a string'):
+            _ = environment.config_trace_format
+
+    def test_unknown(self, isolation, data_dir, platform):
+        env_config = {'trace-format': 'foo'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(
+            ValueError, match='Field `tool.hatch.envs.default.trace-format` must be one of: jsonl, chrome'
+        ):
+            _ = environment.config_trace_format
+
+
+class TestImageBudget:
+    def test_default(self, isolation, data_dir, platform):
+        env_config = {}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_image_budget == 0
+
+    def test_correct(self, isolation, data_dir, platform):
+        env_config = {'image-budget': '1.5GB'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        assert environment.config_image_budget == 1500000000
+
+    def test_not_string(self, isolation, data_dir, platform):
+        env_config = {'image-budget': 9000}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(TypeError, match='Field `tool.hatch.envs.default.image-budget` must be a string'):
+            _ = environment.config_image_budget
+
+    def test_invalid(self, isolation, data_dir, platform):
+        env_config = {'image-budget': 'lots'}
+        project = Project(
+            isolation,
+            config={
+                'project': {'name': 'my_app', 'version': '0.0.1'},
+                'tool': {'hatch': {'envs': {'default': env_config}}},
+            },
+        )
+        environment = ContainerEnvironment(
+            isolation, project.metadata, 'default', project.config.envs['default'], {}, data_dir, platform, 0
+        )
+
+        with pytest.raises(
+            ValueError, match='Field `tool.hatch.envs.default.image-budget` must be a size such as `10GB`'
+        ):
+            _ = environment.config_image_budget
@@ -0,0 +1,86 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import io
+import sys
+import tarfile
+
+import pytest
+
+from hatch_containers.backends import CLIBackend
+from hatch_containers.context import get_sdist_files, iter_archive
+
+from .utils import dedent
+
+
+def read_archive(chunks):
+    with tarfile.open(fileobj=io.BytesIO(b''.join(chunks))) as tar:
+        return {member.name: tar.extractfile(member).read() for member in tar.getmembers() if member.isfile()}
+
+
+def test_archive(temp_dir):
+    path = temp_dir / 'foo.txt'
+    path.write_text('foo')
+
+    chunks = list(iter_archive([(str(path), 'project/foo.txt')], {'Dockerfile': b'FROM bar\n'}))
+
+    assert read_archive(chunks) == {'Dockerfile': b'FROM bar\n', 'project/foo.txt': b'foo'}
+
+
+def test_archive_owner(temp_dir):
+    path = temp_dir / 'foo.txt'
+    path.write_text('foo')
+
+    with tarfile.open(fileobj=io.BytesIO(b''.join(iter_archive([(str(path), 'foo.txt')])))) as tar:
+        member = tar.getmember('foo.txt')
+
+    assert member.uid == 0
+    assert member.gid == 0
+
+
+def test_sdist_files(temp_dir):
+    (temp_dir / 'pyproject.toml').write_text(
+        dedent(
+            """
+            [build-system]
+            requires = ["hatchling"]
+            build-backend = "hatchling.build"
+
+            [project]
+            name = "my-app"
+            version = "0.0.1"
+            """
+        )
+    )
+    (temp_dir / '.gitignore').write_text('dist/\n')
+    (temp_dir / 'my_app').mkdir()
+    (temp_dir / 'my_app' / '__init__.py').touch()
+    (temp_dir / 'dist').mkdir()
+    (temp_dir / 'dist' / 'my_app-0.0.1.tar.gz').touch()
+
+    names = sorted(name for _, name in get_sdist_files(temp_dir))
+
+    assert names == ['.gitignore', 'my_app/__init__.py', 'pyproject.toml']
+
+
+class TestStreamedCommand:
+    def test_success(self, temp_dir, platform):
+        output = temp_dir / 'output'
+        command = [
+            sys.executable,
+            '-c',
+            f'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open({str(output)!r}, "wb"))',
+        ]
+
+        CLIBackend(platform, 0, None).check_streamed_command(command, [b'foo', b'bar'])
+
+        assert output.read_bytes() == b'foobar'
+
+    def test_failure(self, platform, capsys):
+        command = [sys.executable, '-c', 'import sys; print("error"); sys.exit(5)']
+
+        with pytest.raises(SystemExit) as e:
+            CLIBackend(platform, 0, None).check_streamed_command(command, (b'x' * 65536 for _ in range(100)))
+
+        assert e.value.code == 5
+        assert 'error' in capsys.readouterr().out
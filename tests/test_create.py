@@ -120,3 +120,59 @@ def test_dependencies(hatch, container_project, default_container_name, project_
     assert len(lines) == 2
     lines.remove(f'{project_name} @ file:///home/project')
     assert lines[0].startswith('binary==')
+
+
+def test_image_reused(hatch, container_project, default_container_name, default_python_version):
+    with container_project.as_cwd():
+        result = hatch('env', 'create')
+
+    assert result.exit_code == 0, result.output
+
+    build_dir = container_project.parent / 'data' / 'env' / 'container' / 'dockerfiles'
+    fingerprint_file = build_dir / f'python_{default_python_version}-slim' / 'fingerprint.json'
+    assert fingerprint_file.is_file()
+    last_modified = fingerprint_file.stat().st_mtime
+
+    with container_project.as_cwd():
+        result = hatch('env', 'remove')
+        assert result.exit_code == 0, result.output
+
+        result = hatch('env', 'create')
+        assert result.exit_code == 0, result.output
+
+    assert container_exists(default_container_name)
+    assert fingerprint_file.stat().st_mtime == last_modified
+
+
+def test_bake_dependencies(hatch, container_project, default_container_name, project_name):
+    project = Project(container_project)
+    update_project_environment(
+        project,
+        'default',
+        {
+            'dev-mode': False,
+            'start-on-creation': True,
+            'bake-dependencies': True,
+            'dependencies': ['binary'],
+            **project.config.envs['default'],
+        },
+    )
+
+    with container_project.as_cwd():
+        result = hatch('env', 'create')
+
+    assert result.exit_code == 0, result.output
+    assert result.output == dedent(
+        """
+        Creating environment: default
+        Installing project
+        Checking dependencies
+        """
+    )
+
+    output = check_container_output(default_container_name, ['python', '-m', 'pip', 'freeze'])
+    lines = output.strip().splitlines()
+
+    assert len(lines) == 2
+    lines.remove(f'{project_name} @ file:///home/project')
+    assert lines[0].startswith('binary==')
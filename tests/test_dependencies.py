@@ -0,0 +1,41 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from hatch.project.core import Project
+
+from hatch_containers.plugin import ContainerEnvironment
+
+
+def test_recorded_fingerprint_skips_container(isolation, temp_dir, platform):
+    env_config = {'dependencies': ['binary', 'foo']}
+    project = Project(
+        isolation,
+        config={
+            'project': {'name': 'my_app', 'version': '0.0.1'},
+            'tool': {'hatch': {'envs': {'default': env_config}}},
+        },
+    )
+    environment = ContainerEnvironment(
+        isolation, project.metadata, 'default', project.config.envs['default'], {}, temp_dir, platform, 0
+    )
+    environment.save_state(dependencies=environment.dependencies_hash)
+
+    # No container exists so this would fail if it were checked
+    assert environment.dependencies_in_sync()
+
+
+def test_fingerprint_ignores_order(isolation, temp_dir, platform):
+    project = Project(
+        isolation,
+        config={
+            'project': {'name': 'my_app', 'version': '0.0.1'},
+            'tool': {'hatch': {'envs': {'foo': {'dependencies': ['a', 'b']}, 'bar': {'dependencies': ['b', 'a']}}}},
+        },
+    )
+    environments = [
+        ContainerEnvironment(isolation, project.metadata, name, project.config.envs[name], {}, temp_dir, platform, 0)
+        for name in ('foo', 'bar')
+    ]
+
+    assert environments[0].dependencies_hash == environments[1].dependencies_hash
+    assert environments[0].dependencies_image == environments[1].dependencies_image
@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import json
+
+from hatch_containers.dockerfile import PIP_CACHE_MOUNT, construct_dependencies_dockerfile, construct_dockerfile
+
+
+def test_dependencies():
+    dockerfile = construct_dependencies_dockerfile('foo:bar', ['binary', 'foo; python_version > "3"'])
+    lines = dockerfile.splitlines()
+
+    assert lines[0] == 'FROM foo:bar'
+    assert lines[2].startswith('RUN [')
+    assert json.loads(lines[2][4:])[-2:] == ['binary', 'foo; python_version > "3"']
+
+
+def test_builder_source():
+    dockerfile = construct_dockerfile('foo:bar', builder=True, source='project')
+
+    assert dockerfile.splitlines()[-1] == 'COPY project /home/project'
+
+
+def test_builder_dependencies():
+    dockerfile = construct_dockerfile('foo:bar', builder=True, dependencies=['hatchling', 'editables'])
+    lines = dockerfile.splitlines()
+    install_index = next(i for i, line in enumerate(lines) if line.startswith('RUN ['))
+
+    assert install_index < lines.index('COPY . /home/project')
+    assert json.loads(lines[install_index][4:])[-2:] == ['editables', 'hatchling']
+
+
+def test_builder_no_dependencies():
+    dockerfile = construct_dockerfile('foo:bar', builder=True, dependencies=[])
+
+    assert not any(line.startswith('RUN [') for line in dockerfile.splitlines())
+
+
+def test_cache_mounts():
+    dockerfile = construct_dockerfile('foo:bar', builder=True, dependencies=['hatchling'], cache_mounts=True)
+    run_lines = [line for line in dockerfile.splitlines() if line.startswith('RUN')]
+
+    assert len(run_lines) == 2
+    assert all(line.startswith(f'RUN {PIP_CACHE_MOUNT} ') for line in run_lines)
+
+
+def test_dependencies_cache_mounts():
+    dockerfile = construct_dependencies_dockerfile('foo:bar', ['binary'], cache_mounts=True)
+
+    assert dockerfile.splitlines()[2].startswith(f'RUN {PIP_CACHE_MOUNT} [')
+
+
+def test_label():
+    # Images of the plugin are identified by their label once they no longer have a name
+    assert 'LABEL hatch-containers="image"' in construct_dockerfile('foo:bar').splitlines()
+    assert 'LABEL hatch-containers="image"' in construct_dockerfile('foo:bar', builder=True).splitlines()
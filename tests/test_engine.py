@@ -0,0 +1,439 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import hashlib
+import json
+import re
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from hatch_containers.backends import CLIBackend, EngineBackend, get_backend, run_process
+from hatch_containers.engine import (
+    DEFAULT_SOCKET_PATH,
+    MAX_API_VERSION,
+    EngineClient,
+    EngineError,
+    get_socket_path,
+)
+
+from .utils import FakeApplication
+
+
+class StubEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def address_string(self):
+        return 'stub'
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            return self.read_chunks()
+
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def read_chunks(self):
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+            if not size:
+                return b''.join(chunks)
+
+    def handle_request(self, method):
+        state = self.server.state
+        state['requests'].append((method, self.path))
+        version, path = re.match(r'/(?:v([\d.]+)/)?([^?]*)', self.path).groups()
+        body = self.read_body()
+
+        if version is not None and tuple(map(int, version.split('.'))) < state['min_api_version']:
+            self.send_json(400, {'message': f'client version {version} is too old'})
+        elif path == '_ping':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', '2')
+            self.send_header('API-Version', state['api_version'])
+            self.end_headers()
+            self.wfile.write(b'OK')
+        elif path == 'containers/json':
+            filters = json.loads(parse_qs(urlsplit(self.path).query).get('filters', ['{}'])[0])
+            containers = [
+                {'Names': [f'/{name}'], 'State': 'created'}
+                for name, config in state['containers'].items()
+                if all(label in config.get('Labels', {}) for label in filters.get('label', []))
+            ]
+            self.send_json(200, containers)
+        elif path == 'containers/create':
+            name = self.path.split('name=')[1]
+            if name in state['containers']:
+                self.send_json(409, {'message': f'Conflict. The container name "/{name}" is already in use'})
+            else:
+                state['containers'][name] = body
+                self.send_json(201, {'Id': name})
+        elif path == 'images/prune':
+            state['pruned'] = json.loads(parse_qs(urlsplit(self.path).query)['filters'][0])
+            self.send_json(200, {'ImagesDeleted': None, 'SpaceReclaimed': 0})
+        elif path.startswith('images/'):
+            name = path.split('/')[1]
+            if name in state['images']:
+                self.send_json(200, {'Id': state['images'][name], 'Size': 100})
+            else:
+                self.send_json(404, {'message': f'No such image: {name}'})
+        elif path.startswith('containers/') and path.endswith('/archive'):
+            state['archives'][path.split('/')[1]] = body
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif path.startswith('containers/') and path.endswith('/exec'):
+            state['exec'] = body
+            self.send_json(201, {'Id': 'abc'})
+        elif path == 'exec/abc/start':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.docker.multiplexed-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for stream_type, payload in ((1, b'foo\n'), (2, b'bar\n'), (1, b'baz\n')):
+                self.wfile.write(bytes([stream_type, 0, 0, 0]) + len(payload).to_bytes(4, 'big') + payload)
+            self.close_connection = True
+        elif path == 'exec/abc/json':
+            self.send_json(200, {'Running': False, 'ExitCode': 3})
+        elif path.startswith('containers/'):
+            name = path.split('/')[1]
+            if name not in state['containers']:
+                self.send_json(404, {'message': f'No such container: {name}'})
+            elif method == 'DELETE' and name in state['locked']:
+                self.send_json(409, {'message': f'removal of container {name} is already in progress'})
+            else:
+                if method == 'DELETE':
+                    del state['containers'][name]
+
+                self.send_response(204)
+                self.end_headers()
+        else:
+            self.send_json(404, {'message': 'page not found'})
+
+    def do_GET(self):  # noqa: N802
+        self.handle_request('GET')
+
+    def do_POST(self):  # noqa: N802
+        self.handle_request('POST')
+
+    def do_DELETE(self):  # noqa: N802
+        self.handle_request('DELETE')
+
+    def do_PUT(self):  # noqa: N802
+        self.handle_request('PUT')
+
+
+class StubEngineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.state = {
+            'requests': [],
+            'containers': {},
+            'images': {},
+            'archives': {},
+            'connections': 0,
+            'api_version': '1.45',
+            'min_api_version': (1, 24),
+            'locked': set(),
+        }
+
+    def process_request(self, request, client_address):
+        self.state['connections'] += 1
+        super().process_request(request, client_address)
+
+
+@pytest.fixture
+def engine_socket(tmp_path):
+    socket_path = str(tmp_path / 'docker.sock')
+    server = StubEngineServer(socket_path, StubEngineHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield socket_path, server.state
+    finally:
+        server.shutdown()
+        server.server_close()
+        EngineClient(socket_path).pool.close()
+
+
+class TestClient:
+    def test_ping(self, engine_socket):
+        socket_path, state = engine_socket
+        client = EngineClient(socket_path)
+
+        assert client.ping()
+        assert state['requests'] == [('GET', '/_ping')]
+        assert client.api_version == '1.45'
+
+    @pytest.mark.parametrize(
+        'daemon_version, api_version',
+        [('1.40', '1.40'), (MAX_API_VERSION, MAX_API_VERSION), ('1.99', MAX_API_VERSION), ('', '1.24')],
+    )
+    def test_version_negotiation(self, engine_socket, daemon_version, api_version):
+        socket_path, state = engine_socket
+        state['api_version'] = daemon_version
+        client = EngineClient(socket_path)
+
+        client.list_containers()
+
+        assert client.api_version == api_version
+        assert state['requests'][-1][1].startswith(f'/v{api_version}/')
+
+    def test_old_versions_rejected(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        state['api_version'] = '1.51'
+        state['min_api_version'] = (1, 44)
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+
+        backend = get_backend('api', platform, 0, None)
+
+        assert isinstance(backend, EngineBackend)
+        assert backend.list_containers('foo') == {}
+
+    def test_connection_reused(self, engine_socket):
+        socket_path, state = engine_socket
+        client = EngineClient(socket_path)
+
+        client.create_container('foo', {'Image': 'bar'})
+        client.start_container('foo')
+        client.stop_container('foo')
+        client.list_containers()
+        client.remove_container('foo')
+
+        # The version of the API is negotiated first
+        assert len(state['requests']) == 6
+        assert state['connections'] == 1
+
+    def test_error(self, engine_socket):
+        socket_path, _ = engine_socket
+        client = EngineClient(socket_path)
+
+        with pytest.raises(EngineError, match='No such container: foo'):
+            client.start_container('foo')
+
+        client.create_container('foo', {'Image': 'bar'})
+
+    def test_exec(self, engine_socket):
+        socket_path, state = engine_socket
+        client = EngineClient(socket_path)
+        stdout = []
+        stderr = []
+
+        exit_code = client.exec_run('foo', ['echo'], env={'FOO': 'BAR'}, stdout=stdout.append, stderr=stderr.append)
+
+        assert exit_code == 3
+        assert stdout == [b'foo\n', b'baz\n']
+        assert stderr == [b'bar\n']
+        assert state['exec']['Cmd'] == ['echo']
+        assert state['exec']['Env'] == ['FOO=BAR']
+
+    def test_put_archive(self, engine_socket):
+        socket_path, state = engine_socket
+        client = EngineClient(socket_path)
+
+        client.put_archive('foo', '/home/project', iter([b'foo', b'bar']))
+
+        assert state['archives']['foo'] == b'foobar'
+        assert state['requests'][-1] == ('PUT', '/v1.45/containers/foo/archive?path=%2Fhome%2Fproject')
+
+
+def create_context(config_directory, name, host):
+    directory = config_directory / 'contexts' / 'meta' / hashlib.sha256(name.encode('utf-8')).hexdigest()
+    directory.mkdir(parents=True)
+    (directory / 'meta.json').write_text(json.dumps({'Name': name, 'Endpoints': {'docker': {'Host': host}}}))
+
+
+class TestSocketPath:
+    @pytest.fixture(autouse=True)
+    def config_directory(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('DOCKER_CONFIG', str(tmp_path))
+        monkeypatch.delenv('DOCKER_HOST', raising=False)
+        monkeypatch.delenv('DOCKER_CONTEXT', raising=False)
+        return tmp_path
+
+    def test_default(self):
+        assert get_socket_path() == DEFAULT_SOCKET_PATH
+
+    def test_docker_host(self, monkeypatch):
+        monkeypatch.setenv('DOCKER_HOST', 'unix:///run/user/1000/docker.sock')
+        monkeypatch.setenv('DOCKER_CONTEXT', 'colima')
+
+        assert get_socket_path() == '/run/user/1000/docker.sock'
+
+    def test_current_context(self, config_directory):
+        create_context(config_directory, 'colima', 'unix:///home/foo/.colima/default/docker.sock')
+        (config_directory / 'config.json').write_text(json.dumps({'currentContext': 'colima'}))
+
+        assert get_socket_path() == '/home/foo/.colima/default/docker.sock'
+
+    def test_context_env_var(self, config_directory, monkeypatch):
+        create_context(config_directory, 'colima', 'unix:///home/foo/.colima/default/docker.sock')
+        (config_directory / 'config.json').write_text(json.dumps({'currentContext': 'remote'}))
+        monkeypatch.setenv('DOCKER_CONTEXT', 'colima')
+
+        assert get_socket_path() == '/home/foo/.colima/default/docker.sock'
+
+    def test_default_context_env_var(self, config_directory, monkeypatch):
+        (config_directory / 'config.json').write_text(json.dumps({'currentContext': 'colima'}))
+        monkeypatch.setenv('DOCKER_CONTEXT', 'default')
+
+        assert get_socket_path() == DEFAULT_SOCKET_PATH
+
+    def test_remote_context(self, config_directory, monkeypatch):
+        create_context(config_directory, 'remote', 'ssh://foo@example.com')
+        monkeypatch.setenv('DOCKER_CONTEXT', 'remote')
+
+        assert get_socket_path() == ''
+
+    def test_unknown_context(self, monkeypatch):
+        monkeypatch.setenv('DOCKER_CONTEXT', 'missing')
+
+        assert get_socket_path() == ''
+
+
+def test_binary_output(capfdbinary):
+    def run(stdout, stderr):
+        stdout(b'\xff\xfe')
+        stderr(b'\x00\x80')
+        stdout(b'\xe2\x82')
+        stdout(b'\xac')
+        return 0
+
+    process = run_process(['cat'], run)
+    sys.stdout.flush()
+
+    assert process.returncode == 0
+    assert capfdbinary.readouterr() == (b'\xff\xfe\xe2\x82\xac', b'\x00\x80')
+
+
+class TestBackend:
+    def test_fallback_missing_socket(self, tmp_path, monkeypatch, platform):
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{tmp_path / "missing.sock"}')
+
+        backend = get_backend('api', platform, 0, None)
+
+        assert type(backend) is CLIBackend
+
+    def test_fallback_remote_host(self, monkeypatch, platform):
+        monkeypatch.setenv('DOCKER_HOST', 'tcp://127.0.0.1:2375')
+
+        backend = get_backend('api', platform, 0, None)
+
+        assert type(backend) is CLIBackend
+
+    def test_lifecycle(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+
+        backend = get_backend('api', platform, 0, None)
+        assert isinstance(backend, EngineBackend)
+
+        backend.create('foo', 'bar', ['/bin/sleep', 'infinity'], workdir='/home/project', volumes=['/a:/b'])
+        assert backend.exists('foo')
+        assert not backend.exists('baz')
+        assert backend.list_containers('hatch-containers') == {}
+        assert state['containers']['foo'] == {
+            'Image': 'bar',
+            'Cmd': ['/bin/sleep', 'infinity'],
+            'WorkingDir': '/home/project',
+            'Env': [],
+            'Labels': {},
+            'HostConfig': {'Binds': ['/a:/b']},
+        }
+
+        process = backend.exec('foo', ['echo'], capture_output=True)
+        assert process.returncode == 3
+        assert process.stdout == b'foo\nbaz\n'
+        assert process.stderr == b'bar\n'
+
+        backend.start('foo')
+        backend.stop('foo')
+        backend.remove('foo')
+        assert not backend.exists('foo')
+
+    def test_image_id(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+        state['images']['foo'] = 'sha256:123'
+
+        backend = get_backend('api', platform, 0, None)
+
+        assert backend.image_id('foo') == 'sha256:123'
+        assert backend.image_id('bar') == ''
+
+    def test_list_containers(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+
+        backend = get_backend('api', platform, 0, None)
+        backend.create('foo', 'bar', [], workdir='/', labels={'hatch-containers': 'environment'})
+        backend.create('baz', 'bar', [], workdir='/')
+
+        assert state['containers']['foo']['Labels'] == {'hatch-containers': 'environment'}
+        assert backend.list_containers('hatch-containers') == {'foo': 'created'}
+
+    def test_remove_force(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+
+        backend = get_backend('api', platform, 0, None)
+        backend.remove('foo', force=True)
+
+        assert state['requests'][-1] == ('DELETE', '/v1.45/containers/foo?force=1')
+
+    def test_remove_containers(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+
+        backend = get_backend('api', platform, 0, None)
+        for name in ('foo', 'bar', 'baz'):
+            backend.create(name, 'image', [], workdir='/')
+
+        backend.remove_containers(['foo', 'bar', 'missing'])
+
+        assert list(state['containers']) == ['baz']
+
+    def test_remove_containers_error(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        backend = EngineBackend(EngineClient(socket_path), platform, 0, FakeApplication())
+        for name in ('foo', 'bar'):
+            backend.create(name, 'image', [], workdir='/')
+        state['locked'].add('bar')
+
+        with pytest.raises(SystemExit, match='^removal of container bar is already in progress$'):
+            backend.remove_containers(['foo', 'bar', 'missing'])
+
+        assert list(state['containers']) == ['bar']
+
+    def test_images(self, engine_socket, monkeypatch, platform):
+        socket_path, state = engine_socket
+        monkeypatch.setenv('DOCKER_HOST', f'unix://{socket_path}')
+        state['images']['foo'] = 'sha256:123'
+
+        backend = get_backend('api', platform, 0, None)
+        backend.prune_images('hatch-containers')
+
+        assert backend.inspect_images(['foo', 'bar']) == {'foo': ('sha256:123', 100)}
+        assert state['pruned'] == {'label': ['hatch-containers']}
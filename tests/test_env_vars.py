@@ -0,0 +1,137 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import os
+import subprocess
+import sys
+
+from hatch_containers.backends import ENV_FILE_THRESHOLD, CLIBackend, remove_env_files
+from hatch_containers.utils import fingerprint
+
+from .utils import FakeApplication, create_environment
+
+
+class TestApply:
+    def test_flags(self, temp_dir):
+        command = []
+
+        CLIBackend.apply_env_vars(command, {'FOO': 'BAR'}, str(temp_dir))
+
+        assert command == ['--env', 'FOO=BAR']
+        assert not list(temp_dir.iterdir())
+
+    def test_env_file(self, temp_dir):
+        env = {f'VAR{i}': str(i) for i in range(ENV_FILE_THRESHOLD + 1)}
+        env['MULTILINE'] = 'foo\nbar'
+        command = []
+
+        CLIBackend.apply_env_vars(command, env, str(temp_dir))
+
+        assert command[0] == '--env-file'
+        assert command[2:] == ['--env', 'MULTILINE=foo\nbar']
+        with open(command[1], encoding='utf-8') as f:
+            assert f.read().splitlines() == [f'VAR{i}={i}' for i in range(ENV_FILE_THRESHOLD + 1)]
+
+        if sys.platform != 'win32':
+            assert os.stat(command[1]).st_mode & 0o777 == 0o600
+
+    def test_env_file_per_command(self, temp_dir):
+        env = {f'VAR{i}': str(i) for i in range(ENV_FILE_THRESHOLD + 1)}
+        first = []
+        second = []
+
+        CLIBackend.apply_env_vars(first, env, str(temp_dir))
+        CLIBackend.apply_env_vars(second, {**env, 'VAR0': 'changed'}, str(temp_dir))
+
+        assert first[1] != second[1]
+        with open(first[1], encoding='utf-8') as f:
+            assert f.readline() == 'VAR0=0\n'
+        with open(second[1], encoding='utf-8') as f:
+            assert f.readline() == 'VAR0=changed\n'
+
+    def test_env_file_removed(self, temp_dir):
+        command = []
+        CLIBackend.apply_env_vars(command, {f'VAR{i}': str(i) for i in range(ENV_FILE_THRESHOLD + 1)}, str(temp_dir))
+
+        remove_env_files(command)
+
+        assert not list(temp_dir.iterdir())
+
+    def test_stale_env_files_pruned(self, temp_dir):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        stale_file = temp_dir / f'{process.pid}_abc.env'
+        stale_file.touch()
+        command = []
+
+        CLIBackend.apply_env_vars(command, {f'VAR{i}': str(i) for i in range(ENV_FILE_THRESHOLD + 1)}, str(temp_dir))
+
+        assert list(temp_dir.iterdir()) == [temp_dir / os.path.basename(command[1])]
+
+    def test_no_directory(self):
+        env = {f'VAR{i}': str(i) for i in range(ENV_FILE_THRESHOLD + 1)}
+        command = []
+
+        CLIBackend.apply_env_vars(command, env)
+
+        assert command.count('--env') == len(env)
+
+
+def create_env_vars_environment(root, data_dir, platform, env_vars):
+    return create_environment(root, data_dir, platform, **{'env-vars': env_vars})
+
+
+def test_created_env_vars_not_repeated(isolation, temp_dir, platform, docker):
+    environment = create_env_vars_environment(isolation, temp_dir, platform, {'FOO': 'BAR'})
+    environment.create()
+
+    assert docker.created[environment.container_name]['env']['FOO'] == 'BAR'
+    assert environment.get_exec_env_vars() == {}
+    assert environment.construct_container_command(['python']) == [
+        'docker',
+        'exec',
+        environment.container_name,
+        'python',
+    ]
+
+
+def test_changed_env_vars(isolation, temp_dir, platform, docker):
+    create_env_vars_environment(isolation, temp_dir, platform, {'FOO': 'BAR', 'BAZ': 'foo'}).create()
+
+    environment = create_env_vars_environment(isolation, temp_dir, platform, {'FOO': 'BAR', 'BAZ': 'bar', 'NEW': 'var'})
+
+    assert environment.get_exec_env_vars() == {'BAZ': 'bar', 'NEW': 'var'}
+
+
+def test_recorded_fingerprints_keyed(isolation, temp_dir, platform, docker):
+    environment = create_env_vars_environment(isolation, temp_dir, platform, {'FOO': 'BAR'})
+    environment.create()
+
+    assert environment.load_state()['env']['FOO'] != fingerprint('BAR')
+    if sys.platform != 'win32':
+        assert os.stat(environment.env_key_file).st_mode & 0o777 == 0o600
+
+
+def test_env_vars_not_recorded(isolation, temp_dir, platform, docker):
+    environment = create_env_vars_environment(isolation, temp_dir, platform, {'FOO': 'BAR'})
+
+    assert environment.get_exec_env_vars() == environment.get_container_env_vars()
+    assert environment.get_exec_env_vars()['FOO'] == 'BAR'
+
+
+def test_custom_env_vars(isolation, temp_dir, platform):
+    assert not create_environment(isolation, temp_dir, platform).has_custom_env_vars()
+    assert create_env_vars_environment(isolation, temp_dir, platform, {'PIP_INDEX_URL': 'url'}).has_custom_env_vars()
+
+
+def test_dependencies_not_baked(isolation, temp_dir, platform, docker):
+    app = FakeApplication()
+    env_config = {'bake-dependencies': True, 'dependencies': ['foo'], 'env-vars': {'PIP_INDEX_URL': 'url'}}
+    environment = create_environment(isolation, temp_dir, platform, app=app, **env_config)
+
+    environment.create()
+
+    assert docker.created[environment.container_name]['image'] == environment.image
+    assert environment.dependencies_image not in docker.builds
+    assert 'dependencies' not in environment.load_state()
+    assert len(app.warnings) == 1
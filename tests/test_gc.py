@@ -0,0 +1,132 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import subprocess
+
+import pytest
+from click.testing import CliRunner
+
+from hatch_containers import images as gc
+from hatch_containers.backends import CLIBackend
+from hatch_containers.images import ImageUsage, collect_images, parse_size, select_images
+
+from .utils import FakeDocker, create_environment
+
+
+@pytest.mark.parametrize(
+    ('size', 'expected'),
+    [('100', 100), ('512MB', 512_000_000), ('1.5 GiB', 1_610_612_736), ('10gb', 10_000_000_000)],
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize('size', ['', 'GB', '10 parsecs', '-1GB'])
+def test_parse_size_invalid(size):
+    with pytest.raises(ValueError):
+        parse_size(size)
+
+
+class TestSelect:
+    def test_least_recently_used(self):
+        usage = {'a:1': 3, 'b:1': 1, 'c:1': 2}
+        images = {'a:1': ('sha256:a', 10), 'b:1': ('sha256:b', 10), 'c:1': ('sha256:c', 10)}
+
+        assert select_images(usage, images, set(), 15) == ['b:1', 'c:1']
+
+    def test_within_budget(self):
+        images = {'a:1': ('sha256:a', 10)}
+
+        assert select_images({'a:1': 1}, images, set(), 10) == []
+
+    def test_in_use(self):
+        usage = {'a:1': 1, 'b:1': 2, 'c:1': 3}
+        images = {'a:1': ('sha256:a', 10), 'b:1': ('sha256:b' + '0' * 63, 10), 'c:1': ('sha256:c', 10)}
+
+        # Containers may refer to images by name or by truncated ID
+        assert select_images(usage, images, {'a:1', 'b' + '0' * 11}, 0) == ['c:1']
+
+    def test_same_image(self):
+        usage = {'a:1': 1, 'a:2': 4, 'b:1': 2}
+        images = {'a:1': ('sha256:a', 10), 'a:2': ('sha256:a', 10), 'b:1': ('sha256:b', 10)}
+
+        # The image is only counted once and is as recent as the most recent use of any of its names
+        assert select_images(usage, images, set(), 10) == ['b:1']
+        assert select_images(usage, images, set(), 0) == ['b:1', 'a:1', 'a:2']
+
+
+def test_collect(temp_dir):
+    usage = ImageUsage(str(temp_dir))
+    for image in ('a:1', 'missing:1', 'b:1', 'c:1'):
+        usage.touch(image)
+
+    docker = FakeDocker(images={'a:1': 'sha256:a', 'b:1': 'sha256:b', 'c:1': 'sha256:c'})
+    docker.create('foo', 'a:1', [], workdir='/')
+
+    assert collect_images(docker, usage, 20) == ['b:1']
+    assert docker.get_calls('remove_images', 'prune_images') == [
+        ('remove_images', ['b:1']),
+        ('prune_images', 'hatch-containers'),
+    ]
+    assert sorted(usage.load()) == ['a:1', 'c:1']
+
+
+def test_touch(temp_dir, monkeypatch):
+    usage = ImageUsage(str(temp_dir / 'images'))
+    monkeypatch.setattr(gc.time, 'time', lambda: 1)
+    usage.touch('a:1', 'b:1')
+    monkeypatch.setattr(gc.time, 'time', lambda: 2)
+    usage.touch('b:1')
+
+    assert usage.load() == {'a:1': 1, 'b:1': 2}
+
+
+class FakePlatform:
+    def __init__(self, stdout):
+        self.stdout = stdout
+        self.commands = []
+
+    def run_command(self, command, **kwargs):
+        self.commands.append(command)
+        return subprocess.CompletedProcess(command, 1, self.stdout.encode('utf-8'), b'')
+
+
+def test_cli_inspect_images():
+    platform = FakePlatform('sha256:a\t10\ta:1 a:2\nsha256:b\t20\tb:1\n')
+    backend = CLIBackend(platform, 0, None)
+
+    assert backend.inspect_images(['a:1', 'b:1', 'c:1']) == {'a:1': ('sha256:a', 10), 'b:1': ('sha256:b', 20)}
+    assert platform.commands[0][-3:] == ['a:1', 'b:1', 'c:1']
+
+
+def test_automatic(isolation, temp_dir, platform, docker):
+    docker.images['old:hatch-container'] = 'sha256:old'
+    environment = create_environment(isolation, temp_dir, platform, **{'image-budget': '1B'})
+    environment.image_usage.touch('old:hatch-container')
+
+    environment.create()
+
+    # The image of the new container is over budget but in use
+    assert docker.get_calls('remove_images', 'prune_images') == [
+        ('remove_images', ['old:hatch-container']),
+        ('prune_images', 'hatch-containers'),
+    ]
+    assert list(environment.image_usage.load()) == ['python_3.11:hatch-container']
+
+
+def test_command(temp_dir, monkeypatch):
+    docker = FakeDocker(images={'a:1': 'sha256:a'})
+    monkeypatch.setattr(gc, 'get_backend', lambda *args: docker)
+    ImageUsage(str(temp_dir / 'images')).touch('a:1')
+
+    result = CliRunner().invoke(gc.main, ['--budget', '0', '--data-dir', str(temp_dir)])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == 'Removed image: a:1\n'
+
+
+def test_command_invalid_budget(temp_dir):
+    result = CliRunner().invoke(gc.main, ['--budget', 'lots', '--data-dir', str(temp_dir)])
+
+    assert result.exit_code == 2
+    assert 'invalid size: lots' in result.output
@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import threading
+
+import pytest
+
+from hatch_containers import plugin
+
+from .utils import FakeApplication, create_environment
+
+
+def test_concurrent_builds(isolation, temp_dir, platform, docker):
+    docker.build_delay = 0.1
+    environments = [create_environment(isolation, temp_dir, platform) for _ in range(4)]
+
+    threads = [threading.Thread(target=environment.build_image) for environment in environments]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert docker.builds == ['python_3.11:hatch-container']
+
+
+def test_built_by_other_process(isolation, temp_dir, platform, docker):
+    create_environment(isolation, temp_dir, platform).build_image()
+
+    # Forget about the build as if it happened in another process
+    plugin.BUILT_IMAGES.clear()
+    create_environment(isolation, temp_dir, platform).build_image()
+
+    assert docker.builds == ['python_3.11:hatch-container']
+
+
+def test_base_image_changed(isolation, temp_dir, platform, docker):
+    create_environment(isolation, temp_dir, platform).build_image()
+
+    plugin.BUILT_IMAGES.clear()
+    docker.images['python:3.11'] = 'sha256:updated'
+    create_environment(isolation, temp_dir, platform).build_image()
+
+    assert docker.builds == ['python_3.11:hatch-container', 'python_3.11:hatch-container']
+
+
+@pytest.mark.parametrize('available', [True, False])
+def test_buildkit_cache(isolation, temp_dir, platform, docker, available):
+    docker.buildkit = available
+
+    create_environment(isolation, temp_dir, platform, **{'buildkit-cache': True}).build_image()
+
+    dockerfile, buildkit = docker.dockerfiles[0]
+    assert buildkit is available
+    assert ('--mount=type=cache' in dockerfile) is available
+
+
+class TestPull:
+    def resolve(self, isolation, temp_dir, platform, policy, image='python:3.11'):
+        # Every resolution happens in a new process
+        plugin.RESOLVED_IMAGES.clear()
+
+        environment = create_environment(isolation, temp_dir, platform, app=FakeApplication(), **{'image-pull': policy})
+        environment.resolve_image(image)
+        return environment
+
+    def test_always(self, isolation, temp_dir, platform, docker):
+        self.resolve(isolation, temp_dir, platform, 'always')
+        self.resolve(isolation, temp_dir, platform, 'always')
+
+        assert docker.get_calls('pull') == [('pull', 'python:3.11'), ('pull', 'python:3.11')]
+
+    def test_once_per_process(self, isolation, temp_dir, platform, docker):
+        environment = self.resolve(isolation, temp_dir, platform, 'always')
+        environment.resolve_image('python:3.11')
+
+        assert docker.get_calls('pull') == [('pull', 'python:3.11')]
+
+    def test_daily(self, isolation, temp_dir, platform, docker):
+        self.resolve(isolation, temp_dir, platform, 'daily')
+        self.resolve(isolation, temp_dir, platform, 'daily')
+
+        assert docker.get_calls('pull') == [('pull', 'python:3.11')]
+
+    def test_daily_expired(self, isolation, temp_dir, platform, docker, monkeypatch):
+        self.resolve(isolation, temp_dir, platform, 'daily')
+        monkeypatch.setattr(plugin.time, 'time', lambda: 2**40)
+        self.resolve(isolation, temp_dir, platform, 'daily')
+
+        assert docker.get_calls('pull') == [('pull', 'python:3.11'), ('pull', 'python:3.11')]
+
+    def test_daily_local_image_changed(self, isolation, temp_dir, platform, docker):
+        self.resolve(isolation, temp_dir, platform, 'daily')
+        docker.images['python:3.11'] = 'sha256:other'
+        self.resolve(isolation, temp_dir, platform, 'daily')
+
+        assert docker.get_calls('pull') == [('pull', 'python:3.11'), ('pull', 'python:3.11')]
+
+    def test_missing(self, isolation, temp_dir, platform, docker):
+        self.resolve(isolation, temp_dir, platform, 'missing')
+        self.resolve(isolation, temp_dir, platform, 'missing', image='python:3.12')
+
+        assert docker.get_calls('pull') == [('pull', 'python:3.12')]
+
+    def test_never(self, isolation, temp_dir, platform, docker):
+        self.resolve(isolation, temp_dir, platform, 'never')
+
+        with pytest.raises(SystemExit, match='Image `python:3.12` is not available locally'):
+            self.resolve(isolation, temp_dir, platform, 'never', image='python:3.12')
+
+        assert docker.get_calls('pull') == []
+
+    def test_offline(self, isolation, temp_dir, platform, docker):
+        docker.online = False
+
+        environment = self.resolve(isolation, temp_dir, platform, 'always')
+
+        assert environment.app.warnings == ['Unable to pull image `python:3.11`, using the local copy']
+        with pytest.raises(SystemExit, match='offline'):
+            self.resolve(isolation, temp_dir, platform, 'always', image='python:3.12')
@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from hatch_containers.keepalive import KeepAlive
+
+
+@pytest.fixture
+def keep_alive(temp_dir, monkeypatch):
+    keep_alive = KeepAlive(str(temp_dir / 'container'), 'container', 1)
+    keep_alive.calls = []
+    monkeypatch.setattr(keep_alive, 'spawn_reaper', lambda: keep_alive.calls.append('spawn'))
+    monkeypatch.setattr(keep_alive, 'stop', lambda: keep_alive.calls.append('stop'))
+    return keep_alive
+
+
+def get_exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def test_cold_start(keep_alive):
+    keep_alive.acquire(lambda: keep_alive.calls.append('start'))
+
+    assert keep_alive.calls == ['start']
+    assert os.path.isfile(keep_alive.lease_file)
+
+
+def test_warm_start(keep_alive):
+    os.makedirs(keep_alive.directory)
+    with open(keep_alive.reaper_file, 'w', encoding='utf-8') as f:
+        f.write(str(os.getpid()))
+
+    keep_alive.acquire(lambda: keep_alive.calls.append('start'))
+
+    assert keep_alive.calls == []
+
+
+def test_warm_start_running(keep_alive):
+    os.makedirs(keep_alive.directory)
+    with open(keep_alive.reaper_file, 'w', encoding='utf-8') as f:
+        f.write(str(os.getpid()))
+
+    keep_alive.acquire(lambda: keep_alive.calls.append('start'), lambda: True)
+
+    assert keep_alive.calls == []
+
+
+def test_warm_start_stopped(keep_alive):
+    os.makedirs(keep_alive.directory)
+    with open(keep_alive.reaper_file, 'w', encoding='utf-8') as f:
+        f.write(str(os.getpid()))
+
+    keep_alive.acquire(lambda: keep_alive.calls.append('start'), lambda: False)
+
+    assert keep_alive.calls == ['start']
+
+
+def test_release(keep_alive):
+    keep_alive.acquire(lambda: None)
+    keep_alive.release()
+
+    assert keep_alive.calls == ['spawn']
+    assert os.path.isfile(keep_alive.last_used_file)
+    assert not os.path.isfile(keep_alive.lease_file)
+
+
+def test_stale_leases(keep_alive):
+    keep_alive.acquire(lambda: None)
+    stale_lease = os.path.join(keep_alive.leases_directory, str(get_exited_pid()))
+    with open(stale_lease, 'w', encoding='utf-8'):
+        pass
+
+    assert keep_alive.active_leases() == 1
+    assert not os.path.isfile(stale_lease)
+
+
+def test_reap_idle(keep_alive):
+    keep_alive.acquire(lambda: None)
+    keep_alive.release()
+    os.utime(keep_alive.last_used_file, (0, 0))
+
+    keep_alive.reap()
+
+    assert keep_alive.calls == ['spawn', 'stop']
+    assert not os.path.isfile(keep_alive.reaper_file)
+
+
+@pytest.mark.parametrize(
+    'remove, command',
+    [
+        (False, ['docker', 'stop', '--time', '0', 'container']),
+        (True, ['docker', 'rm', '--force', 'container']),
+    ],
+)
+def test_stop(temp_dir, monkeypatch, remove, command):
+    commands = []
+    monkeypatch.setattr(
+        subprocess, 'run', lambda args, **_: commands.append(args) or subprocess.CompletedProcess(args, 0)
+    )
+
+    KeepAlive(str(temp_dir / 'container'), 'container', 1, remove=remove).stop()
+
+    assert commands == [command]
+
+
+def test_stop_traced(temp_dir, monkeypatch):
+    monkeypatch.setattr(subprocess, 'run', lambda args, **_: subprocess.CompletedProcess(args, 0))
+    path = temp_dir / 'trace.jsonl'
+
+    KeepAlive(str(temp_dir / 'container'), 'container', 1, trace=str(path)).stop()
+
+    (span,) = [json.loads(line) for line in path.read_text().splitlines()]
+    assert span['operation'] == 'stop'
+    assert span['target'] == 'container'
+    assert span['exit_code'] == 0
@@ -0,0 +1,53 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import os
+import subprocess
+import sys
+
+import pytest
+
+from hatch_containers.pool import BuilderPool
+
+
+@pytest.fixture
+def pool(temp_dir):
+    return BuilderPool(str(temp_dir / 'pool'), 'hatch-builder_123', 2, 60)
+
+
+def test_container_name(pool):
+    assert pool.container_name(1) == 'hatch-builder_123_1'
+
+
+def test_acquire(pool):
+    assert pool.acquire() == 0
+    assert pool.acquire() == 1
+    assert pool.acquire() is None
+
+
+def test_release(pool):
+    assert pool.acquire() == 0
+    assert pool.acquire() == 1
+
+    pool.release(0)
+
+    assert pool.acquire() == 0
+
+
+def test_abandoned_slot(pool):
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+
+    os.makedirs(pool.slot_directory(0))
+    with open(os.path.join(pool.slot_directory(0), 'pid'), 'w', encoding='utf-8') as f:
+        f.write(str(process.pid))
+
+    assert pool.acquire() == 0
+
+
+def test_keep_alive(pool):
+    keep_alive = pool.keep_alive(1)
+
+    assert keep_alive.container_name == 'hatch-builder_123_1'
+    assert keep_alive.timeout == 60
+    assert keep_alive.remove is True
@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from .utils import create_environment
+
+
+def create_snapshot_environment(root, data_dir, platform, dependencies):
+    return create_environment(root, data_dir, platform, snapshot=True, dependencies=dependencies)
+
+
+def test_snapshot_after_sync(isolation, temp_dir, platform, docker):
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['foo'])
+    environment.create()
+    assert docker.created[environment.container_name]['image'] == 'python_3.11:hatch-container'
+
+    environment.sync_dependencies()
+
+    assert docker.image_id(environment.snapshot_image)
+    assert environment.load_state()['snapshot'] == environment.snapshot_image
+
+
+def test_restore(isolation, temp_dir, platform, docker):
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['foo'])
+    environment.create()
+    environment.sync_dependencies()
+
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['foo'])
+    environment.create()
+
+    assert docker.created[environment.container_name]['image'] == environment.snapshot_image
+    assert environment.dependencies_in_sync()
+
+
+def test_dependencies_changed(isolation, temp_dir, platform, docker):
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['foo'])
+    environment.create()
+    environment.sync_dependencies()
+    old_snapshot = environment.snapshot_image
+
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['bar'])
+    environment.create()
+    assert docker.created[environment.container_name]['image'] == 'python_3.11:hatch-container'
+
+    environment.sync_dependencies()
+
+    assert environment.snapshot_image != old_snapshot
+    assert docker.get_calls('remove_image') == [('remove_image', old_snapshot)]
+
+
+def test_not_synced_after_install(isolation, temp_dir, platform, docker):
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['foo'])
+    environment.create()
+
+    environment.install_project_dev_mode()
+
+    assert not docker.image_id(environment.snapshot_image)
+
+
+def test_image_inspected_once(isolation, temp_dir, platform, docker):
+    environment = create_snapshot_environment(isolation, temp_dir, platform, ['foo'])
+    environment.create()
+
+    inspected = []
+    image_id = docker.image_id
+    docker.image_id = lambda image: inspected.append(image) or image_id(image)
+    environment.sync_dependencies()
+
+    assert environment.image not in inspected
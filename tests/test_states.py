@@ -0,0 +1,162 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import os
+from subprocess import CompletedProcess
+
+import click
+import pytest
+
+from hatch_containers.backends import CLIBackend
+
+from .utils import FakeApplication, create_environment
+
+
+@pytest.fixture(autouse=True)
+def existing_containers(docker):
+    docker.containers.update({'my-app_foo': 'exited', 'my-app_foo_builder': 'running'})
+
+
+def test_single_query(isolation, temp_dir, platform, docker):
+    environments = [create_environment(isolation, temp_dir, platform, name) for name in ('foo', 'bar', 'baz')]
+
+    assert [environment.exists() for environment in environments] == [True, False, False]
+    assert docker.calls == [('list_containers', 'hatch-containers')]
+
+
+def test_exact_names(isolation, temp_dir, platform, docker):
+    docker.containers = {'my-app_foo_builder': 'running'}
+
+    assert not create_environment(isolation, temp_dir, platform, 'foo').exists()
+
+
+def test_lifecycle(isolation, temp_dir, platform, docker):
+    environment = create_environment(isolation, temp_dir, platform, 'bar', **{'start-on-creation': True})
+    assert not environment.exists()
+
+    environment.create()
+    assert environment.exists()
+    assert environment.container_status() == 'running'
+
+    environment.remove()
+    assert not environment.exists()
+
+    assert docker.get_calls('remove', 'create', 'start', 'remove_containers') == [
+        ('remove', 'my-app_bar', True),
+        ('create', 'my-app_bar', {'hatch-containers': 'environment'}),
+        ('start', 'my-app_bar'),
+        ('remove_containers', ['my-app_bar']),
+    ]
+    assert docker.calls.count(('list_containers', 'hatch-containers')) == 1
+
+
+def test_unlabeled_removed_once(isolation, temp_dir, platform, docker):
+    environment = create_environment(isolation, temp_dir, platform, 'bar')
+    environment.create()
+    environment.remove()
+    environment = create_environment(isolation, temp_dir, platform, 'bar')
+    environment.create()
+
+    assert docker.get_calls('remove') == [('remove', environment.container_name, True)]
+
+
+def test_keep_alive_status(isolation, temp_dir, platform, docker):
+    environment = create_environment(isolation, temp_dir, platform, 'foo', **{'keep-alive': 60})
+
+    assert environment.container_status() == 'exited'
+    assert docker.calls == [('status', 'my-app_foo')]
+
+
+def test_keep_alive_stopped_externally(isolation, temp_dir, platform, docker):
+    environment = create_environment(isolation, temp_dir, platform, 'foo', **{'keep-alive': 60})
+    # A reaper is watching the container but the daemon was restarted
+    environment.keep_alive_directory.ensure_dir_exists()
+    (environment.keep_alive_directory / 'reaper.pid').write_text(str(os.getpid()))
+
+    environment.activate()
+
+    assert docker.get_calls('start') == [('start', 'my-app_foo')]
+    assert docker.containers['my-app_foo'] == 'running'
+
+
+class FakePlatform:
+    def __init__(self, output):
+        self.output = output
+        self.commands = []
+
+    def check_command_output(self, command):
+        self.commands.append(command)
+        return self.output
+
+
+def test_cli_list_containers():
+    platform = FakePlatform('foo\trunning\nbar\texited\n')
+    backend = CLIBackend(platform, 0, None)
+
+    assert backend.list_containers('hatch-containers') == {'foo': 'running', 'bar': 'exited'}
+    assert platform.commands == [
+        ['docker', 'ps', '-a', '--format', '{{.Names}}\t{{.State}}', '--filter', 'label=hatch-containers']
+    ]
+
+
+class TestRemoval:
+    def test_batched(self, isolation, temp_dir, platform, docker):
+        docker.containers.update({f'my-app_{name}': 'exited' for name in ('bar', 'baz')})
+        environments = [create_environment(isolation, temp_dir, platform, name) for name in ('foo', 'bar', 'baz')]
+
+        with click.Context(click.Command('hatch')):
+            for environment in environments:
+                environment.remove()
+
+            assert docker.containers
+            assert not any(environment.exists() for environment in environments)
+
+        assert docker.calls == [
+            ('list_containers', 'hatch-containers'),
+            ('remove_containers', ['my-app_foo', 'my-app_foo_builder', 'my-app_bar', 'my-app_baz']),
+        ]
+        assert not docker.containers
+
+    def test_recreated(self, isolation, temp_dir, platform, docker):
+        environment = create_environment(isolation, temp_dir, platform, 'foo')
+
+        with click.Context(click.Command('hatch')):
+            environment.remove()
+            environment.create()
+
+        assert environment.exists()
+        assert docker.get_calls('remove', 'create', 'remove_containers') == [
+            ('remove_containers', ['my-app_foo', 'my-app_foo_builder']),
+            ('remove', 'my-app_foo', True),
+            ('create', 'my-app_foo', {'hatch-containers': 'environment'}),
+        ]
+
+
+class TestBackend:
+    def test_cli(self):
+        platform = FakePlatform('')
+        platform.run_command = lambda command, **_: platform.commands.append(command) or CompletedProcess(command, 0)
+        backend = CLIBackend(platform, 0, None)
+
+        backend.remove_containers(['foo', 'bar'])
+        backend.remove_volumes(['baz'])
+
+        assert platform.commands == [['docker', 'rm', '--force', 'foo', 'bar'], ['docker', 'volume', 'rm', 'baz']]
+
+    def test_cli_missing_ignored(self):
+        platform = FakePlatform('')
+        stderr = b'Error response from daemon: No such container: bar\nError: No such volume: baz\n'
+        platform.run_command = lambda command, **_: CompletedProcess(command, 1, b'', stderr)
+        backend = CLIBackend(platform, 0, FakeApplication())
+
+        backend.remove_containers(['foo', 'bar'])
+        backend.remove_volumes(['baz'])
+
+    def test_cli_error(self):
+        platform = FakePlatform('')
+        stderr = b'Error response from daemon: No such container: bar\nCannot connect to the Docker daemon\n'
+        platform.run_command = lambda command, **_: CompletedProcess(command, 1, b'', stderr)
+        backend = CLIBackend(platform, 0, FakeApplication())
+
+        with pytest.raises(SystemExit, match='^Cannot connect to the Docker daemon$'):
+            backend.remove_containers(['foo', 'bar'])
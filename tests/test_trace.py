@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+import json
+
+import pytest
+
+from hatch_containers.trace import TracedBackend, Tracer, get_tracer
+
+from .utils import FakeDocker, create_environment
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_json_lines(temp_dir):
+    path = temp_dir / 'trace.jsonl'
+    tracer = Tracer(str(path), 'jsonl')
+
+    with tracer.span('start', environment='default') as fields:
+        fields['exit_code'] = 0
+
+    (span,) = read_lines(path)
+    assert span['operation'] == 'start'
+    assert span['environment'] == 'default'
+    assert span['exit_code'] == 0
+    assert span['duration'] >= 0
+
+
+def test_error(temp_dir):
+    path = temp_dir / 'trace.jsonl'
+    tracer = Tracer(str(path), 'jsonl')
+
+    with pytest.raises(RuntimeError), tracer.span('start'):
+        raise RuntimeError
+
+    (span,) = read_lines(path)
+    assert span['error'] is True
+
+
+def test_chrome(temp_dir):
+    path = temp_dir / 'traces' / 'trace.json'
+    tracer = Tracer(str(path), 'chrome')
+
+    with tracer.span('start', target='foo'):
+        pass
+    with tracer.span('stop', target='foo'):
+        pass
+
+    # The closing bracket is optional so that the file may be appended to
+    events = json.loads(f'{path.read_text().rstrip().rstrip(",")}]')
+    assert [event['name'] for event in events] == ['start', 'stop']
+    assert all(event['ph'] == 'X' and event['args'] == {'target': 'foo'} for event in events)
+    assert events[0]['ts'] <= events[1]['ts']
+
+
+def test_shared_tracer(temp_dir):
+    path = str(temp_dir / 'trace.jsonl')
+
+    assert get_tracer(path, 'jsonl') is get_tracer(path, 'jsonl')
+
+
+class TestTracedBackend:
+    def test_operations(self, temp_dir, monkeypatch):
+        path = temp_dir / 'trace.jsonl'
+        backend = FakeDocker()
+        monkeypatch.setattr(backend, 'stop', lambda name: 1 / 0)
+        docker = TracedBackend(backend, Tracer(str(path), 'jsonl'), environment='default', image='foo:bar')
+
+        docker.start('my_app_default')
+        process = docker.exec('my_app_default', ['python'])
+        with pytest.raises(ZeroDivisionError):
+            docker.stop('my_app_default')
+
+        assert process.returncode == 0
+        assert backend.calls == [('start', 'my_app_default'), ('exec', 'my_app_default', ['python'])]
+        assert [
+            (span['operation'], span['environment'], span['image'], span['target'], span.get('exit_code'))
+            for span in read_lines(path)
+        ] == [
+            ('start', 'default', 'foo:bar', 'my_app_default', None),
+            ('exec', 'default', 'foo:bar', 'my_app_default', 0),
+            ('stop', 'default', 'foo:bar', 'my_app_default', None),
+        ]
+        assert read_lines(path)[-1]['error'] is True
+
+    def test_passthrough(self, temp_dir):
+        path = temp_dir / 'trace.jsonl'
+        docker = TracedBackend(FakeDocker(), Tracer(str(path), 'jsonl'), environment='default', image='foo:bar')
+
+        command = []
+        docker.apply_env_vars(command, {'FOO': 'bar'})
+
+        assert command == ['--env', 'FOO=bar']
+        assert not path.exists()
+
+
+def test_disabled(isolation, temp_dir, platform):
+    environment = create_environment(isolation, temp_dir, platform)
+
+    assert not isinstance(environment.docker, TracedBackend)
+    with environment.trace('cp') as fields:
+        assert fields == {}
+
+
+def test_enabled(isolation, temp_dir, platform):
+    path = temp_dir / 'trace.jsonl'
+    environment = create_environment(isolation, temp_dir, platform, trace=str(path))
+
+    assert isinstance(environment.docker, TracedBackend)
+    with environment.trace('cp', 'my_app_default_builder'):
+        pass
+
+    (span,) = read_lines(path)
+    assert span['operation'] == 'cp'
+    assert span['environment'] == 'default'
+    assert span['image'] == 'python_3.11:hatch-container'
+    assert span['target'] == 'my_app_default_builder'
@@ -0,0 +1,30 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from hatch_containers.utils import fingerprint, load_json, save_json
+
+
+class TestFingerprint:
+    def test_stable(self):
+        assert fingerprint('foo', 'bar') == fingerprint('foo', 'bar')
+
+    def test_part_boundaries(self):
+        assert fingerprint('foo', 'bar') != fingerprint('foob', 'ar')
+
+
+class TestJSON:
+    def test_round_trip(self, temp_dir):
+        path = temp_dir / 'data.json'
+        save_json(path, {'foo': 'bar'})
+
+        assert load_json(path) == {'foo': 'bar'}
+        assert [p.name for p in temp_dir.iterdir()] == ['data.json']
+
+    def test_missing(self, temp_dir):
+        assert load_json(temp_dir / 'data.json') == {}
+
+    def test_invalid(self, temp_dir):
+        path = temp_dir / 'data.json'
+        path.write_text('{')
+
+        assert load_json(path) == {}
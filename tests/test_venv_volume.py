@@ -0,0 +1,65 @@
+# SPDX-FileCopyrightText: 2023-present Ofek Lev <oss@ofek.dev>
+#
+# SPDX-License-Identifier: MIT
+from .utils import create_environment
+
+
+def create_venv_environment(root, data_dir, platform, **env_config):
+    env_config = {'venv-volume': True, 'dependencies': ['foo'], **env_config}
+    return create_environment(root, data_dir, platform, **env_config)
+
+
+def test_mounted(isolation, temp_dir, platform, docker):
+    environment = create_venv_environment(isolation, temp_dir, platform)
+
+    environment.create()
+
+    assert f'{environment.venv_volume}:/home/venv' in docker.created[environment.container_name]['volumes']
+
+
+def test_keyed_by_dependencies(isolation, temp_dir, platform, docker):
+    foo = create_venv_environment(isolation, temp_dir, platform)
+    bar = create_venv_environment(isolation, temp_dir, platform, dependencies=['bar'])
+
+    assert foo.venv_volume != bar.venv_volume
+    assert foo.venv_volume == create_venv_environment(isolation, temp_dir, platform).venv_volume
+
+
+def test_removed(isolation, temp_dir, platform, docker):
+    environment = create_venv_environment(isolation, temp_dir, platform)
+    environment.create()
+
+    environment.remove()
+
+    assert docker.get_calls('remove_volumes') == [('remove_volumes', [environment.venv_volume])]
+
+
+def test_kept(isolation, temp_dir, platform, docker):
+    environment = create_venv_environment(isolation, temp_dir, platform, **{'keep-venv-volume': True})
+    environment.create()
+
+    environment.remove()
+
+    assert docker.get_calls('remove_volumes') == []
+
+
+def test_kept_reused(isolation, temp_dir, platform, docker):
+    environment = create_venv_environment(isolation, temp_dir, platform, **{'keep-venv-volume': True})
+    environment.create()
+    environment.remove()
+
+    environment.create()
+
+    assert docker.get_calls('remove_volumes') == []
+
+
+def test_kept_superseded(isolation, temp_dir, platform, docker):
+    environment = create_venv_environment(isolation, temp_dir, platform, **{'keep-venv-volume': True})
+    environment.create()
+    environment.remove()
+    old_volume = environment.venv_volume
+
+    environment = create_venv_environment(isolation, temp_dir, platform, dependencies=['bar'])
+    environment.create()
+
+    assert docker.get_calls('remove_volumes') == [('remove_volumes', [old_volume])]
@@ -1,11 +1,17 @@
 # SPDX-FileCopyrightText: 2021-present Ofek Lev <oss@ofek.dev>
 #
 # SPDX-License-Identifier: MIT
+import itertools
 import subprocess
+import time
 from textwrap import dedent as _dedent
 
 import tomli
 import tomli_w
+from hatch.project.core import Project
+
+from hatch_containers.backends import CLIBackend
+from hatch_containers.plugin import ContainerEnvironment
 
 
 def dedent(text):
@@ -49,3 +55,144 @@ def update_project_environment(project, name, config):
 
     with open(str(project_file), 'w', encoding='utf-8') as f:
         f.write(tomli_w.dumps(raw_config))
+
+
+def create_environment(root, data_dir, platform, name='default', app=None, **env_config):
+    env_config = {'image': 'python:3.11', **env_config}
+    project = Project(
+        root,
+        config={
+            'project': {'name': 'my_app', 'version': '0.0.1'},
+            'tool': {'hatch': {'envs': {name: env_config}}},
+        },
+    )
+    return ContainerEnvironment(root, project.metadata, name, project.config.envs[name], {}, data_dir, platform, 0, app)
+
+
+class FakeApplication:
+    def __init__(self):
+        self.warnings = []
+
+    def abort(self, text='', code=1):
+        raise SystemExit(text)
+
+    def display_warning(self, text):
+        self.warnings.append(text)
+
+
+class FakeDocker:
+    """
+    Stands in for the backend of environments, recording every call and keeping just enough state about
+    containers and images for the plugin to work.
+    """
+
+    # Every image has the same size
+    image_size = 10
+
+    def __init__(self, containers=None, images=None):
+        # Statuses and creation options keyed by container name
+        self.containers: dict[str, str] = dict(containers or {})
+        self.created: dict[str, dict] = {}
+        self.images: dict[str, str] = {'python:3.11': 'sha256:base', **(images or {})}
+        self.calls: list[tuple] = []
+        self.ids = itertools.count(1)
+
+        self.builds: list[str] = []
+        self.dockerfiles: list[tuple[str, bool]] = []
+        self.build_delay = 0.0
+        self.buildkit = True
+        self.online = True
+
+    apply_env_vars = staticmethod(CLIBackend.apply_env_vars)
+
+    def buildkit_available(self):
+        return self.buildkit
+
+    def image_id(self, image):
+        return self.images.get(image, '')
+
+    def pull(self, image):
+        self.calls.append(('pull', image))
+        if not self.online:
+            return subprocess.CompletedProcess(['docker', 'pull', image], 1, b'', b'offline')
+
+        self.images.setdefault(image, f'sha256:{image}')
+        return subprocess.CompletedProcess(['docker', 'pull', image], 0, b'', b'')
+
+    def build(self, tag, dockerfile, context, *, pull=True, buildkit=False):
+        # Give any concurrent build a chance to start
+        time.sleep(self.build_delay)
+        self.calls.append(('build', tag))
+        self.builds.append(tag)
+        self.dockerfiles.append((dockerfile.read_text(), buildkit))
+        self.images[tag] = f'sha256:{next(self.ids)}'
+
+    def commit(self, name, image):
+        self.calls.append(('commit', name, image))
+        self.images[image] = f'sha256:{next(self.ids)}'
+
+    def create(self, name, image, command, *, volumes=(), env=None, labels=None, **kwargs):
+        self.calls.append(('create', name, labels))
+        self.containers[name] = 'created'
+        self.created[name] = {'image': image, 'command': command, 'volumes': list(volumes), 'env': env}
+
+    def start(self, name):
+        self.calls.append(('start', name))
+        self.containers[name] = 'running'
+
+    def stop(self, name):
+        self.calls.append(('stop', name))
+        self.containers[name] = 'exited'
+
+    def pause(self, name):
+        self.calls.append(('pause', name))
+        self.containers[name] = 'paused'
+
+    def unpause(self, name):
+        self.calls.append(('unpause', name))
+        self.containers[name] = 'running'
+
+    def exec(self, name, args, **kwargs):
+        self.calls.append(('exec', name, args))
+        return subprocess.CompletedProcess(args, 0, b'', b'')
+
+    def status(self, name):
+        self.calls.append(('status', name))
+        return self.containers.get(name, '')
+
+    def list_containers(self, label):
+        self.calls.append(('list_containers', label))
+        return dict(self.containers)
+
+    def remove(self, name, *, force=False):
+        self.calls.append(('remove', name, force))
+        self.containers.pop(name, None)
+
+    def remove_containers(self, names):
+        self.calls.append(('remove_containers', names))
+        for name in names:
+            self.containers.pop(name, None)
+
+    def remove_volumes(self, names):
+        self.calls.append(('remove_volumes', names))
+
+    def remove_image(self, image):
+        self.calls.append(('remove_image', image))
+        self.images.pop(image, None)
+
+    def inspect_images(self, names):
+        return {name: (self.images[name], self.image_size) for name in names if name in self.images}
+
+    def container_images(self):
+        return {self.created[name]['image'] for name in self.containers if name in self.created}
+
+    def remove_images(self, names):
+        self.calls.append(('remove_images', names))
+        for name in names:
+            self.images.pop(name, None)
+
+    def prune_images(self, label):
+        self.calls.append(('prune_images', label))
+
+    def get_calls(self, *methods):
+        return [call for call in self.calls if call[0] in methods]